@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+# A bounded key-value cache for things like user sessions, where the
+# activity's plain `session_cache = {}` would grow forever and never expire.
+#
+#   from kv_cache import KVCache
+#   sessions = KVCache(max_entries=100_000, ttl=1800, path='sessions.aof')
+#   sessions.set('user_session:9001', USER_A_DATA)
+#   sessions.get('user_session:9001')          # None once expired or evicted
+#
+# - get/set/delete are O(1): an OrderedDict keeps the entries in least-
+#   recently-used order, so eviction pops from the front.
+# - max_entries and/or max_bytes bound the size; bytes are the length of
+#   each value's JSON encoding.
+# - ttl (seconds, per cache or per set) expires entries. Expired entries
+#   are dropped when read, and each set also drops expired entries at the
+#   LRU end, so old ones do not pile up.
+# - path= keeps an append-only log of sets, deletes and evictions (one JSON
+#   line each) and replays it on start, so a restart is not a cold cache and
+#   holds the same keys as before. When the log has grown to compact_ratio
+#   times the live entries it is rewritten with just those. Recency from
+#   reads is not logged: after a restart the LRU order is the order of the
+#   last writes.
+# - thread_safe=True guards every operation with a lock.
+#
+#   python3 kv_cache.py --bench 200000      # ops/sec and bytes per entry vs dict
+
+import argparse
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+# don't bother compacting logs shorter than this
+COMPACT_MIN_RECORDS = 1000
+
+
+class KVCache:
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, path=None,
+                 thread_safe=False, compact_ratio=2.0, fsync=False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        # key -> (value, expires at or None, size in bytes)
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock() if thread_safe else contextlib.nullcontext()
+        self._log = None
+        self._log_records = 0
+        self.stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evicted': 0, 'expired': 0, 'compactions': 0}
+        if path:
+            self._replay()
+            self._log = open(path, 'a', encoding='utf-8')
+            self._maybe_compact()
+
+    # --- reads and writes ----------------------------------------------
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return default
+            if entry[1] is not None and entry[1] <= time.time():
+                self._remove(key)
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            encoded = self._encode(value) if self._log or self.max_bytes else None
+            size = len(encoded) if encoded is not None else 0
+            if self.max_bytes is not None and size > self.max_bytes:
+                raise ValueError(f"value for {key!r} is {size} bytes, more than max_bytes={self.max_bytes}")
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires, size)
+            self._bytes += size
+            self.stats['sets'] += 1
+            if self._log:
+                self._append('{"op":"set","k":%s,"v":%s,"exp":%s}'
+                             % (json.dumps(key), encoded, json.dumps(expires)))
+            self._evict()
+
+    def delete(self, key):
+        """Remove key; returns True if it was there."""
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._remove(key)
+            if self._log:
+                self._append('{"op":"del","k":%s}' % json.dumps(key))
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            if self._log:
+                self._append('{"op":"clear"}')
+
+    def purge_expired(self):
+        """Drop every expired entry now (O(n)); returns how many went."""
+        now = time.time()
+        with self._lock:
+            gone = [k for k, (_, exp, _) in self._data.items() if exp is not None and exp <= now]
+            for key in gone:
+                self._remove(key)
+            self.stats['expired'] += len(gone)
+            return len(gone)
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    # --- eviction ------------------------------------------------------
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        data = self._data
+        # expired entries that have reached the LRU end go first
+        now = time.time()
+        while data:
+            key, (_, expires, _) = next(iter(data.items()))
+            if expires is None or expires > now:
+                break
+            self._remove(key)
+            self.stats['expired'] += 1
+        while ((self.max_entries is not None and len(data) > self.max_entries)
+               or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            key = next(iter(data))
+            self._remove(key)
+            self.stats['evicted'] += 1
+            # which key went depends on reads, which the log doesn't have
+            if self._log:
+                self._append('{"op":"del","k":%s}' % json.dumps(key))
+
+    # --- persistence ---------------------------------------------------
+
+    @staticmethod
+    def _encode(value):
+        return json.dumps(value, separators=(',', ':'))
+
+    def _append(self, line):
+        self._log.write(line + '\n')
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._log_records += 1
+        self._maybe_compact()
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        good = 0   # offset just past the last intact record
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn write from a crash; only the tail can be torn
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                good += len(line)
+                self._log_records += 1
+                op, key = record.get('op'), record.get('k')
+                if op == 'set':
+                    if key in self._data:
+                        self._remove(key)
+                    if record['exp'] is None or record['exp'] > now:
+                        # sized like set() sizes it while a log is open
+                        size = len(self._encode(record['v']))
+                        self._data[key] = (record['v'], record['exp'], size)
+                        self._bytes += size
+                elif op == 'del' and key in self._data:
+                    self._remove(key)
+                elif op == 'clear':
+                    self._data.clear()
+                    self._bytes = 0
+        if good < os.path.getsize(self.path):
+            # cut the torn tail off, or the next record would be glued to it
+            os.truncate(self.path, good)
+        self._evict()
+
+    def _maybe_compact(self):
+        if self._log_records >= COMPACT_MIN_RECORDS and self._log_records > self.compact_ratio * len(self._data):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with only the live entries, in LRU order."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp = self.path + '.tmp'
+            now = time.time()
+            records = 0
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for key, (value, expires, _) in self._data.items():
+                    if expires is not None and expires <= now:
+                        continue
+                    f.write('{"op":"set","k":%s,"v":%s,"exp":%s}\n'
+                            % (json.dumps(key), self._encode(value), json.dumps(expires)))
+                    records += 1
+                f.flush()
+                os.fsync(f.fileno())
+            if self._log:
+                self._log.close()
+            os.replace(tmp, self.path)
+            self._log = open(self.path, 'a', encoding='utf-8')
+            self._log_records = records
+            self.stats['compactions'] += 1
+
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- benchmark -----------------------------------------------------------
+
+def session(i):
+    return {'user_id': i, 'username': f'user_{i}', 'last_login': '2025-10-20T10:30:00Z',
+            'recent_activity': ['viewed_lab_4', 'checked_forum']}
+
+
+def bench(n, tmpdir):
+    keys = [f'user_session:{i}' for i in range(n)]
+    values = [session(i) for i in range(n)]
+
+    def run(name, make, set_item, get_item):
+        cache = make()
+        start = time.perf_counter()
+        for k, v in zip(keys, values):
+            set_item(cache, k, v)
+        set_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for k in keys:
+            get_item(cache, k)
+        get_time = time.perf_counter() - start
+        # memory is measured on a second, untimed fill; the values are shared
+        # by every run, so this is the container's own cost per entry
+        if hasattr(cache, 'close'):
+            cache.close()
+        del cache
+        tracemalloc.start()
+        cache = make()
+        for k, v in zip(keys, values):
+            set_item(cache, k, v)
+        memory = tracemalloc.get_traced_memory()[0] / len(cache)
+        tracemalloc.stop()
+        print(f"{name:<36} set {n / set_time:12,.0f}/s  get {n / get_time:12,.0f}/s  "
+              f"{memory:7.0f} bytes/entry")
+        return cache
+
+    def cache_set(c, k, v):
+        c.set(k, v)
+
+    def cache_get(c, k):
+        c.get(k)
+
+    def dict_set(c, k, v):
+        c[k] = v
+
+    run('dict', dict, dict_set, lambda c, k: c.get(k))
+    run('KVCache()', KVCache, cache_set, cache_get)
+    run('KVCache(max_entries=n/2, ttl=60)', lambda: KVCache(max_entries=n // 2, ttl=60), cache_set, cache_get)
+    run('KVCache(max_bytes=..., thread_safe)', lambda: KVCache(max_bytes=100 * n, thread_safe=True),
+        cache_set, cache_get)
+    path = os.path.join(tmpdir, 'bench.aof')
+
+    def logged():
+        if os.path.exists(path):
+            os.remove(path)
+        return KVCache(path=path)
+
+    cache = run('KVCache(path=...)', logged, cache_set, cache_get)
+    cache.close()
+    start = time.perf_counter()
+    with KVCache(path=path) as warm:
+        print(f"restart: replayed {len(warm)} entries from {os.path.getsize(path) / 1e6:.1f} MB "
+              f"in {time.perf_counter() - start:.2f}s")
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark KVCache against a plain dict.')
+    parser.add_argument('--bench', type=int, default=200000, metavar='N', help='entries to set and get')
+    parser.add_argument('--dir', default='.', help='where to put the benchmark log file')
+    args = parser.parse_args()
+    bench(args.bench, args.dir)
+
+
+if __name__ == '__main__':
+    main()
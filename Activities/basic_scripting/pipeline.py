@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+# Run the basic_scripting filters as one fast stdin -> stdout pipeline.
+#
+# pipeline_stage_1.sh, pipeline_stage_2.sh and process_file_unattended.*
+# handle one line at a time, and the bash versions start `tr` or `cut` for
+# every line. This runner:
+#
+#   1. Reads stdin in big binary blocks (1 MB by default) and cuts each one
+#      at its last newline, so every chunk holds whole lines.
+#   2. Runs the stages over a whole chunk with map()/filter(). Chunks go to
+#      a pool of worker processes and come back in input order.
+#   3. Only when a stage raises on a chunk does it redo that chunk line by
+#      line, setting the bad rows aside. Clean chunks never pay for a
+#      try/except per line.
+#   4. Writes through one large buffered binary sink.
+#
+# Stages, applied left to right (fields count from 1, like cut -f):
+#
+#   lower            lowercase the line (ASCII, like tr in the C locale)
+#   field:N          keep only field N
+#   filter:MIN[:N]   keep lines whose field N (default 2) is > MIN
+#   double[:N]       append ",<field N * 2>" (default field 2)
+#
+# Usage:
+#   ./pipeline.py lower double < data.csv          # pipeline_stage_1.sh | pipeline_stage_2.sh
+#   ./pipeline.py filter:10 < data.txt             # process_file_unattended.py
+#   ./pipeline.py -w 4 --rejects bad.txt lower field:3 < big.csv > out.txt
+#   ./pipeline.py --benchmark 200000               # lines/sec against bash and per-line Python
+
+import argparse
+import collections
+import hashlib
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+CHUNK_SIZE = 1024 * 1024
+OUTPUT_BUFFER = 4 * 1024 * 1024
+
+# bad rows echoed to stderr when there is no --rejects file
+SHOW_REJECTS = 5
+
+
+# Each stage is ('map', line -> line) or ('filter', line -> bool); lines
+# are bytes without the newline.
+
+def lower(line):
+    return line.lower()
+
+
+def field(n, sep):
+    def stage(line):
+        return line.split(sep)[n - 1]
+    return stage
+
+
+def above(minimum, n, sep):
+    def stage(line):
+        return int(line.split(sep)[n - 1]) > minimum
+    return stage
+
+
+def double(n, sep):
+    def stage(line):
+        return b'%s%s%d' % (line, sep, int(line.split(sep)[n - 1]) * 2)
+    return stage
+
+
+def parse_stage(spec, sep=b','):
+    name, *args = spec.split(':')
+    try:
+        if name == 'lower' and not args:
+            return 'map', lower
+        if name == 'field' and len(args) == 1:
+            return 'map', field(int(args[0]), sep)
+        if name == 'filter' and len(args) in (1, 2):
+            return 'filter', above(int(args[0]), int(args[1]) if len(args) == 2 else 2, sep)
+        if name == 'double' and len(args) <= 1:
+            return 'map', double(int(args[0]) if args else 2, sep)
+    except ValueError:
+        pass
+    raise ValueError(f"bad stage {spec!r}: expected lower, field:N, filter:MIN[:N] or double[:N]")
+
+
+def chunks(stream, chunk_size=CHUNK_SIZE):
+    """Yield blocks of whole lines (each ending in a newline) from a binary stream."""
+    rest = b''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        cut = block.rfind(b'\n')
+        if cut < 0:
+            rest += block
+            continue
+        yield rest + block[:cut + 1]
+        rest = block[cut + 1:]
+    if rest:
+        yield rest + b'\n'
+
+
+def run_stages(stages, block):
+    """Apply the stages to one chunk; returns (output bytes, lines in, bad rows).
+
+    Bad rows are (line number within the chunk, line, error).
+    """
+    lines = block.split(b'\n')
+    lines.pop()  # the chunk ends with a newline
+    n = len(lines)
+    try:
+        out = lines
+        for kind, func in stages:
+            out = list(map(func, out) if kind == 'map' else filter(func, out))
+        bad = []
+    except (ValueError, IndexError):
+        out, bad = _run_lines(stages, lines)
+    return (b'\n'.join(out) + b'\n' if out else b''), n, bad
+
+
+def _run_lines(stages, lines):
+    # the slow path: one line at a time, so one bad row only loses itself
+    out, bad = [], []
+    for i, line in enumerate(lines):
+        value = line
+        try:
+            for kind, func in stages:
+                if kind == 'map':
+                    value = func(value)
+                elif not func(value):
+                    break
+            else:
+                out.append(value)
+        except (ValueError, IndexError) as e:
+            bad.append((i, line, f"{type(e).__name__}: {e}"))
+    return out, bad
+
+
+_stages = None
+
+
+def _init_worker(specs, sep):
+    global _stages
+    _stages = [parse_stage(spec, sep) for spec in specs]
+
+
+def _work(block):
+    return run_stages(_stages, block)
+
+
+def process(specs, source, sink, workers=1, sep=b',', rejects=None, chunk_size=CHUNK_SIZE):
+    """Run the stages named by `specs` from one binary stream to another.
+
+    Returns (lines read, lines written, bad rows).
+    """
+    stages = [parse_stage(spec, sep) for spec in specs]
+    totals = {'read': 0, 'written': 0, 'bad': 0}
+
+    def emit(result):
+        data, n, bad = result
+        sink.write(data)
+        written = data.count(b'\n')
+        for i, line, error in bad:
+            number = totals['read'] + i + 1
+            if rejects is not None:
+                rejects.write(b'%d\t%s\t%s\n' % (number, error.encode(), line))
+            elif totals['bad'] < SHOW_REJECTS:
+                print(f"skipping line {number}: {error}: {line.decode(errors='replace')}", file=sys.stderr)
+            totals['bad'] += 1
+        totals['read'] += n
+        totals['written'] += written
+
+    if workers <= 1:
+        for block in chunks(source, chunk_size):
+            emit(run_stages(stages, block))
+    else:
+        # Pool.imap would read all of stdin ahead of the workers; keeping a
+        # few chunks per worker in flight bounds memory and keeps the order
+        with Pool(workers, _init_worker, (specs, sep)) as pool:
+            pending = collections.deque()
+            for block in chunks(source, chunk_size):
+                pending.append(pool.apply_async(_work, (block,)))
+                if len(pending) >= workers * 2:
+                    emit(pending.popleft().get())
+            while pending:
+                emit(pending.popleft().get())
+    sink.flush()
+    return totals['read'], totals['written'], totals['bad']
+
+
+# --- benchmark ---------------------------------------------------------
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# what the bash and per-line Python scripts do, written the per-line way
+PER_LINE_LOWER_DOUBLE = '''
+import sys
+for line in sys.stdin:
+    line = line.rstrip("\\n").lower()
+    value = int(line.split(",")[1])
+    print(f"{line},{value * 2}")
+'''
+
+
+def generate(path, lines):
+    names = ['Bob', 'Sally', 'Lee', 'Alice', 'Omar', 'Priya', 'Chen']
+    majors = ['Art', 'Engineering', 'Pottery', 'Data Science', 'History']
+    rng = random.Random(2002)
+    with open(path, 'w', buffering=OUTPUT_BUFFER) as f:
+        for i in range(lines):
+            f.write(f"{rng.choice(names)}{i},{rng.randrange(100)},{rng.choice(majors)}\n")
+
+
+def timed(command, path):
+    with open(path, 'rb') as stdin:
+        start = time.perf_counter()
+        result = subprocess.run(command, stdin=stdin, capture_output=True, check=True)
+        elapsed = time.perf_counter() - start
+    return elapsed, hashlib.md5(result.stdout).hexdigest()
+
+
+def benchmark(lines, workers, bash_lines):
+    python = sys.executable
+    me = os.path.abspath(__file__)
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, 'data.csv')
+        sample = os.path.join(tmp, 'sample.csv')
+        generate(data, lines)
+        # bash forks for every line, so it only gets a small sample
+        generate(sample, min(lines, bash_lines))
+        stage_1 = os.path.join(HERE, 'pipeline_stage_1.sh')
+        stage_2 = os.path.join(HERE, 'pipeline_stage_2.sh')
+
+        runs = [
+            ('lower | double', [
+                ('bash stages', ['bash', '-c', f'bash {stage_1} | bash {stage_2}'], sample),
+                ('per-line Python', [python, '-c', PER_LINE_LOWER_DOUBLE], data),
+                ('pipeline.py', [python, me, 'lower', 'double'], data),
+                (f'pipeline.py -w {workers}', [python, me, '-w', str(workers), 'lower', 'double'], data),
+            ]),
+            ('filter:10', [
+                ('process_file_unattended.sh', ['bash', os.path.join(HERE, 'process_file_unattended.sh')], sample),
+                ('process_file_unattended.py', [python, os.path.join(HERE, 'process_file_unattended.py')], data),
+                ('pipeline.py', [python, me, 'filter:10'], data),
+                (f'pipeline.py -w {workers}', [python, me, '-w', str(workers), 'filter:10'], data),
+            ]),
+        ]
+        for title, commands in runs:
+            print(f"{title}: {lines} lines (bash: {min(lines, bash_lines)})")
+            base, digests = None, {}
+            for name, command, path in commands:
+                elapsed, digest = timed(command, path)
+                rate = (lines if path == data else min(lines, bash_lines)) / elapsed
+                base = base or rate
+                digests.setdefault(path, set()).add(digest)
+                print(f"  {name:<28} {elapsed:8.3f}s {rate:12,.0f} lines/s {rate / base:8.1f}x")
+            same = all(len(d) == 1 for d in digests.values())
+            print(f"  outputs {'identical' if same else 'DIFFER'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply line stages to stdin in parallel, in order.')
+    parser.add_argument('stages', nargs='*', help='lower, field:N, filter:MIN[:N], double[:N]')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='worker processes (default 1)')
+    parser.add_argument('-d', '--delimiter', default=',')
+    parser.add_argument('--rejects', metavar='FILE', help='write bad rows here (line number, error, line)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='bytes per chunk')
+    parser.add_argument('--benchmark', type=int, metavar='LINES', help='compare against the bash and per-line scripts')
+    parser.add_argument('--bash-lines', type=int, default=2000, help='sample size for the bash scripts in --benchmark')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(args.benchmark, max(args.workers, 2), args.bash_lines)
+        return 0
+    if not args.stages:
+        parser.error('no stages given')
+    sep = args.delimiter.encode()
+    try:
+        for spec in args.stages:
+            parse_stage(spec, sep)
+    except ValueError as e:
+        parser.error(str(e))
+
+    source = sys.stdin.buffer
+    sink = open(sys.stdout.fileno(), 'wb', buffering=OUTPUT_BUFFER, closefd=False)
+    rejects = open(args.rejects, 'wb') if args.rejects else None
+    try:
+        read, written, bad = process(args.stages, source, sink, args.workers, sep, rejects, args.chunk_size)
+    except BrokenPipeError:
+        # e.g. piped into head; stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if rejects:
+            rejects.close()
+    if bad:
+        print(f"{read} lines read, {written} written, {bad} skipped", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
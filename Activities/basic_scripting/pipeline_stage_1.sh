@@ -1,4 +1,5 @@
 #!/bin/bash
+# one fork of tr per line; see pipeline.py for a chunked version
 
 while IFS= read -r line; do
   echo "$line" | tr '[:upper:]' '[:lower:]' # Example: convert to lowercase
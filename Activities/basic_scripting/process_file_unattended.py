@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+# one line at a time; pipeline.py filter:10 does the same on big inputs
 import sys
 
 for line in sys.stdin:
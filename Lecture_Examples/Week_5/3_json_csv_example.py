@@ -1,17 +1,195 @@
 #!/usr/bin/env python3
 # 3_json_csv_example.py
+#
+# Convert JSON from a pipe to CSV, one record at a time.
+#
+# json.loads(sys.stdin.read()) holds the whole input, and then every parsed
+# object, in memory at once. Here the array is parsed element by element
+# with json.JSONDecoder.raw_decode() as stdin arrives, so memory stays the
+# same no matter how long the input is.
+#
+#   echo '{"people": [{"name": "Ann", "age": 30}]}' | ./3_json_csv_example.py
+#   ./3_json_csv_example.py --path data.items < big.json > big.csv
+#   ./3_json_csv_example.py --path '' < array.json          # top level is the array
+#   ./3_json_csv_example.py --ndjson --fields name,address.city < people.ndjson
+#
+# Nested objects become dotted columns ({"address": {"city": "X"}} ->
+# address.city); lists are written as JSON text. Without --fields the columns
+# come from the first --infer records.
 
-import sys, json, csv
+import argparse
+import csv
+import json
+import sys
 
-# Read the JSON from the pipe
-data = json.loads(sys.stdin.read())
+READ_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+DELIMITERS = ',]}:'
 
-# Create a CSV writer that writes to stdout
-writer = csv.DictWriter(sys.stdout, fieldnames=['name', 'age'])
 
-# Write the header row
-writer.writeheader()
+class JSONStream:
+    """Walk JSON text from a file without reading all of it first."""
 
-# Iterate through the JSON data and write to CSV
-for person in data['people']:
-    writer.writerow(person)
+    def __init__(self, f, read_size=READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size=None):
+        # drop what has been consumed, then read more; False at end of input
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.read_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"expected {' or '.join(repr(x) for x in chars)}, found {c or 'end of input'!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        size = self.read_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number cut off by the end of the buffer still decodes
+                # (8330. as 8330, 1e-07 as 1), so only trust a value that a
+                # delimiter follows
+                after = end
+                while after < len(self.buf) and self.buf[after] in WHITESPACE:
+                    after += 1
+                if self.eof or (after < len(self.buf) and self.buf[after] in DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(size)
+            size *= 2   # a big value: read more at a time
+
+    def find_array(self, path):
+        """Move to the first element of the array at `path` (keys joined by dots)."""
+        for key in path.split('.') if path else []:
+            self.expect('{')
+            while True:
+                if self.peek() == '}':
+                    raise KeyError(key)
+                name = self.value()
+                self.expect(':')
+                if name == key:
+                    break
+                self.value()   # skip the value of another key
+                if self.expect(',}') == '}':
+                    raise KeyError(key)
+        self.expect('[')
+
+    def items(self, path='people'):
+        """Yield each element of the array at `path`."""
+        self.find_array(path)
+        if self.peek() == ']':
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def ndjson_records(f):
+    for number, line in enumerate(f, 1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {number}: {e}") from None
+
+
+def flatten(record, prefix=''):
+    """{'a': {'b': 1}, 'c': [1, 2]} -> {'a.b': 1, 'c': '[1, 2]'}"""
+    if not isinstance(record, dict):
+        return {prefix or 'value': record}
+    row = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            row.update(flatten(value, name + '.'))
+        elif isinstance(value, list):
+            row[name] = json.dumps(value)
+        else:
+            row[name] = value
+    return row
+
+
+def write_csv(records, out, fields=None, infer=100):
+    """Write flattened records as CSV; returns how many rows were written."""
+    rows = (flatten(r) for r in records)
+    first = []
+    if not fields:
+        # look at the first few records for the columns, keeping their order
+        fields = {}
+        for row in rows:
+            first.append(row)
+            fields.update(dict.fromkeys(row))
+            if len(first) >= infer:
+                break
+        fields = list(fields)
+        if not fields:
+            return 0
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in first:
+        writer.writerow(row)
+        count += 1
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a JSON array or NDJSON on stdin to CSV.')
+    parser.add_argument('--path', default='people',
+                        help="dotted key of the array to convert ('' if the top level is the array)")
+    parser.add_argument('--ndjson', action='store_true', help='one JSON object per line')
+    parser.add_argument('--fields', help='comma-separated columns (default: inferred)')
+    parser.add_argument('--infer', type=int, default=100, help='records to look at when inferring columns')
+    args = parser.parse_args()
+
+    if args.ndjson:
+        records = ndjson_records(sys.stdin)
+    else:
+        records = JSONStream(sys.stdin).items(args.path)
+    fields = args.fields.split(',') if args.fields else None
+    try:
+        write_csv(records, sys.stdout, fields, args.infer)
+    except KeyError as e:
+        print(f"Error: no key {e} on the way to --path {args.path!r}", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: invalid JSON input: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
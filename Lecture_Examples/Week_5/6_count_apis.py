@@ -5,11 +5,14 @@ import sys
 import json
 
 # Read the JSON objects one by one (because jq outputs them on separate lines)
-api_list = [json.loads(line) for line in sys.stdin]
-
-# Perform the Python-specific logic
-count = len(api_list)
-print(f"We found {count} Transportation APIs:")
-
-for api in api_list:
+# and print each as it arrives; only the count is kept, not the list, so
+# the count comes at the end
+count = 0
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    api = json.loads(line)
+    count += 1
     print(f"  - {api['API']} ({api['Auth']})")
+
+print(f"We found {count} Transportation APIs.")
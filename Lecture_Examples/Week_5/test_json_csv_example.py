@@ -0,0 +1,56 @@
+# Run with: python3 -m pytest test_json_csv_example.py
+#
+# JSONStream must give the same values as json.loads however the input is
+# split into reads: numbers, exponents and literals cut at a read boundary
+# included.
+
+import importlib.util
+import io
+import json
+import os
+import random
+
+import pytest
+
+spec = importlib.util.spec_from_file_location(
+    'json_csv_example', os.path.join(os.path.dirname(__file__), '3_json_csv_example.py'))
+example = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(example)
+
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(8 if depth < 3 else 6)
+    if kind == 0:
+        return rng.randrange(-10 ** 6, 10 ** 6)
+    if kind == 1:
+        return rng.randrange(10 ** 4) + 0.5
+    if kind == 2:
+        return rng.choice([1e-07, -2.5e+12, 3.25e-300, 0.0])
+    if kind == 3:
+        return rng.choice([True, False, None])
+    if kind == 4:
+        return rng.choice(['', 'plain', 'quote " and ] , }', 'café'])
+    if kind == 5:
+        return rng.random()
+    if kind == 6:
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f'k{i}': random_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('read_size', [1, 2, 3, 5, 7, 16])
+def test_read_boundaries(seed, read_size):
+    rng = random.Random(seed)
+    items = [random_value(rng) for _ in range(50)]
+    # scalars before the array are skipped over on the way to --path
+    document = {'skipped': rng.random() * 1e6, 'also': 1e-07, 'data': {'n': 12345, 'items': items}}
+    for indent in (None, 2):
+        text = json.dumps(document, indent=indent)
+        stream = example.JSONStream(io.StringIO(text), read_size)
+        assert list(stream.items('data.items')) == items
+
+
+def test_top_level_floats():
+    values = [i + 0.5 for i in range(20000)]
+    stream = example.JSONStream(io.StringIO(json.dumps(values)), 4096)
+    assert list(stream.items('')) == values
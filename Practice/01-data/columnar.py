@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+
+# Convert the mock_data files to a columnar binary format and read them back.
+#
+# The same dataset is here as CSV, TSV, JSON, XML and SQL, and every script
+# that uses it parses the text again. This converts any of them (and nested
+# JSON such as mock_data_nested.json) to Parquet or Arrow IPC:
+#
+#   - columns get real types: id as the smallest integer that fits, dob
+#     (MM/DD/YYYY) as a date, strings that repeat a lot (at most
+#     DICT_MAX_RATIO distinct values per row) dictionary-encoded;
+#   - Parquet is zstd-compressed, in row groups with min/max statistics;
+#     Arrow IPC is left uncompressed so it can be memory-mapped as is;
+#   - the loader memory-maps the file, reads only the columns asked for, and
+#     pushes --where filters down: Parquet row groups whose statistics rule
+#     them out are never decoded.
+#
+# Needs pyarrow (and numpy for bench --rows): pip install pyarrow
+#
+#   python3 columnar.py convert mock_data.csv mock_data.parquet
+#   python3 columnar.py convert mock_data.xml mock_data.arrow
+#   python3 columnar.py show mock_data.parquet -c id,email -w 'dob>=1995-01-01'
+#   python3 columnar.py bench                                  # the 100-row files here
+#   python3 columnar.py bench --rows 10000000 --dir /tmp/cols  # synthetic, 10M rows
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# dictionary-encode a string column with at most this many distinct values per row
+DICT_MAX_RATIO = 0.5
+ROW_GROUP_SIZE = 1_000_000
+DATE_FORMAT = '%m/%d/%Y'
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+
+# --- reading the text formats ------------------------------------------
+
+def read_delimited(path, delimiter):
+    options = pacsv.ConvertOptions(timestamp_parsers=[DATE_FORMAT])
+    return pacsv.read_csv(path, parse_options=pacsv.ParseOptions(delimiter=delimiter), convert_options=options)
+
+
+def read_json(path):
+    # a JSON array of records, one object (nested JSON), or NDJSON
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return pa.Table.from_pylist(data if isinstance(data, list) else [data])
+
+
+def read_xml(path):
+    # <dataset><record><field>value</field>...</record>...</dataset>
+    columns = {}
+    rows = 0
+    for _, element in ET.iterparse(path):
+        if element.tag != 'record':
+            continue
+        for child in element:
+            columns.setdefault(child.tag, [None] * rows).append(child.text)
+        rows += 1
+        for values in columns.values():
+            if len(values) < rows:
+                values.append(None)
+        element.clear()
+    return pa.table(columns)
+
+
+SQL_INSERT = re.compile(r"insert\s+into\s+\S+\s*\(([^)]*)\)\s*values\s*\((.*)\)\s*;?\s*$", re.I)
+SQL_VALUE = re.compile(r"\s*('(?:[^']|'')*'|[^,]*?)\s*(?:,|$)")
+
+
+def sql_value(token):
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    if token.upper() == 'NULL':
+        return None
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+def read_sql(path):
+    # one INSERT ... VALUES (...); per line, as in mock_data.sql
+    columns = {}
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            m = SQL_INSERT.match(line.strip())
+            if not m:
+                raise ValueError(f"{path}:{number}: not an INSERT ... VALUES statement")
+            names = [n.strip() for n in m.group(1).split(',')]
+            values = [sql_value(v) for v in SQL_VALUE.findall(m.group(2))[:len(names)]]
+            for name, value in zip(names, values):
+                columns.setdefault(name, []).append(value)
+    return pa.table(columns)
+
+
+def read_text(path):
+    """Read any of the text formats into an Arrow table."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        table = read_delimited(path, ',')
+    elif ext == '.tsv':
+        table = read_delimited(path, '\t')
+    elif ext in ('.json', '.ndjson'):
+        table = read_json(path)
+    elif ext == '.xml':
+        table = read_xml(path)
+    elif ext == '.sql':
+        table = read_sql(path)
+    else:
+        raise ValueError(f"don't know how to read {ext} files")
+    return normalize(table)
+
+
+# --- types -------------------------------------------------------------
+
+def smallest_int(column):
+    low, high = pc.min_max(column).values()
+    if low.as_py() is None:
+        return column
+    for t in (pa.int8(), pa.int16(), pa.int32()):
+        bits = t.bit_width - 1
+        if -2 ** bits <= low.as_py() and high.as_py() < 2 ** bits:
+            return column.cast(t)
+    return column
+
+
+def typed(column):
+    """Give one column the narrowest type its values allow."""
+    t = column.type
+    if pa.types.is_integer(t):
+        return smallest_int(column)
+    if pa.types.is_timestamp(t):
+        try:
+            return column.cast(pa.date32())   # only if every value is midnight
+        except pa.ArrowInvalid:
+            return column
+    if not pa.types.is_string(t) and not pa.types.is_large_string(t):
+        return column
+    # text from JSON, XML and SQL: numbers and dates arrive as strings
+    for attempt in (lambda c: smallest_int(c.cast(pa.int64())),
+                    lambda c: pc.strptime(c, DATE_FORMAT, 's').cast(pa.date32())):
+        try:
+            return attempt(column)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass
+    if len(column) and pc.count_distinct(column).as_py() <= DICT_MAX_RATIO * len(column):
+        return column.dictionary_encode()
+    return column
+
+
+def normalize(table):
+    return pa.table({name: typed(table[name]) for name in table.column_names})
+
+
+# --- writing and loading the columnar formats -------------------------
+
+def file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if ext in ARROW_EXTENSIONS:
+        return 'ipc'
+    raise ValueError(f"{path}: use one of {', '.join(PARQUET_EXTENSIONS + ARROW_EXTENSIONS)}")
+
+
+def write(table, path):
+    if file_format(path) == 'parquet':
+        pq.write_table(table, path, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+    else:
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table, max_chunksize=ROW_GROUP_SIZE)
+
+
+def convert(source, target):
+    table = read_text(source)
+    write(table, target)
+    return table
+
+
+WHERE = re.compile(r'^\s*([\w.]+)\s*(==|=|!=|<=|>=|<|>)\s*(.*?)\s*$')
+
+
+def where_expression(schema, conditions):
+    """['dob>=1995-01-01', 'first_name==Ann'] -> one dataset filter expression."""
+    expression = None
+    for condition in conditions or []:
+        m = WHERE.match(condition)
+        if not m:
+            raise ValueError(f"bad condition {condition!r}: expected column OP value")
+        name, op, text = m.groups()
+        if name not in schema.names:
+            raise ValueError(f"no column {name!r}; columns are {', '.join(schema.names)}")
+        t = schema.field(name).type
+        if pa.types.is_dictionary(t):
+            t = t.value_type
+        # parse the literal at the widest type of its kind, not the column's
+        # narrowed one (id<1000 against an int8 id), and let Arrow widen
+        if pa.types.is_integer(t):
+            t = pa.int64()
+        elif pa.types.is_floating(t):
+            t = pa.float64()
+        value = pa.scalar(text.strip('\'"')).cast(t)
+        field = ds.field(name)
+        term = {'==': field == value, '=': field == value, '!=': field != value, '<': field < value,
+                '<=': field <= value, '>': field > value, '>=': field >= value}[op]
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def load(path, columns=None, where=None):
+    """Memory-map a Parquet or Arrow file, reading only `columns` and the rows matching `where`."""
+    dataset = ds.dataset(path, format=file_format(path), filesystem=pafs.LocalFileSystem(use_mmap=True))
+    return dataset.to_table(columns=columns, filter=where_expression(dataset.schema, where))
+
+
+# --- benchmark ---------------------------------------------------------
+
+# what the scripts do today: parse the text into Python rows
+def python_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8', newline='') as f:
+        if ext in ('.csv', '.tsv'):
+            return sum(1 for _ in csv.DictReader(f, delimiter='\t' if ext == '.tsv' else ','))
+        if ext == '.ndjson':
+            return sum(1 for line in f if json.loads(line))
+        if ext == '.json':
+            return len(json.load(f))
+        if ext == '.xml':
+            return sum(1 for _, e in ET.iterparse(f) if e.tag == 'record' and (e.clear() or True))
+        if ext == '.sql':
+            return sum(1 for line in f if SQL_INSERT.match(line.strip()))
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def synthetic(rows, seed=2002):
+    """A mock_data-like table of any size, built column-wise."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    first_names = ['Jereme', 'Bernice', 'Freeman', 'Fiona', 'Sansone', 'Darell', 'Ira', 'Stewart',
+                   'Ardelia', 'Roddy', 'Tybi', 'Vergil', 'Raeann', 'Nadya', 'Becka', 'Evelyn']
+    last_names = ['Bruna', 'Maior', 'Michel', 'Purle', 'Marchetti', 'Crut', 'Cron', 'Blewitt',
+                  'Sealey', 'Judd', 'Lindell', 'Conrad', 'Kernell', 'Betts', 'Brockhurst', 'Euler']
+    domains = ['ask.com', 'hibu.com', 'samsung.com', 'ihg.com', 'irs.gov', 'stanford.edu', 'hud.gov']
+
+    def pick(values):
+        return pa.DictionaryArray.from_arrays(pa.array(rng.integers(0, len(values), rows, dtype=np.int32)),
+                                              pa.array(values))
+
+    ids = pa.array(np.arange(1, rows + 1, dtype=np.int32))
+    first, last, domain = pick(first_names), pick(last_names), pick(domains)
+    email = pc.binary_join_element_wise(
+        pc.utf8_lower(pc.utf8_slice_codeunits(first.cast(pa.string()), 0, 1)),
+        pc.utf8_lower(last.cast(pa.string())), ids.cast(pa.string()), '@', domain.cast(pa.string()), '')
+    ip = pc.binary_join_element_wise(
+        *[pa.array(rng.integers(1, 255, rows, dtype=np.int32)).cast(pa.string()) for _ in range(4)], '.')
+    start = np.datetime64('1975-01-01')
+    dob = pa.array(start + rng.integers(0, 30 * 365, rows).astype('timedelta64[D]'))
+    return pa.table({'id': ids, 'first_name': first, 'last_name': last, 'email': email,
+                     'ip_address': ip, 'dob': dob.cast(pa.date32())})
+
+
+def write_text(table, directory):
+    """Write the table as CSV, TSV and NDJSON the way mock_data looks."""
+    text = table.set_column(table.schema.get_field_index('dob'), 'dob',
+                            pc.strftime(table['dob'].cast(pa.timestamp('s')), DATE_FORMAT))
+    text = pa.table({name: (c.cast(pa.string()) if pa.types.is_dictionary(c.type) else c)
+                     for name, c in zip(text.column_names, text.columns)})
+    paths = {}
+    for ext, delimiter in (('.csv', ','), ('.tsv', '\t')):
+        paths[ext] = os.path.join(directory, 'mock_data' + ext)
+        pacsv.write_csv(text, paths[ext], pacsv.WriteOptions(delimiter=delimiter, quoting_style='needed'))
+    paths['.ndjson'] = os.path.join(directory, 'mock_data.ndjson')
+    with open(paths['.ndjson'], 'w', encoding='utf-8') as f:
+        for batch in text.to_batches(max_chunksize=200_000):
+            for row in batch.to_pylist():
+                f.write(json.dumps(row, separators=(',', ':')) + '\n')
+    return paths
+
+
+def bench(directory, rows, repeat):
+    if rows:
+        table = synthetic(rows)
+        text_paths = write_text(table, directory)
+        sample = text_paths['.csv']
+        where = [f'id<{max(rows // 100, 1)}']
+    else:
+        text_paths = {ext: os.path.join(HERE, 'mock_data' + ext) for ext in ('.csv', '.tsv', '.json', '.xml', '.sql')}
+        sample = text_paths['.csv']
+        table = read_text(sample)
+        rows = table.num_rows
+        where = ['id<50']
+    print(f"{rows:,} rows; filter {' and '.join(where)}, projection id,email")
+    print(f"{'file':<28} {'size':>12} {'load':>10} {'rows/s':>14}")
+
+    def line(name, path, seconds, n=rows):
+        print(f"{name:<28} {os.path.getsize(path) / 1e6:10.2f}MB {seconds * 1000:8.1f}ms {n / seconds:14,.0f}")
+
+    for ext, path in text_paths.items():
+        line(f"{os.path.basename(path)} (Python)", path, best_time(lambda: python_rows(path), repeat))
+    line("mock_data.csv (pyarrow.csv)", sample, best_time(lambda: read_delimited(sample, ','), repeat))
+
+    for name in ('mock_data.parquet', 'mock_data.arrow'):
+        path = os.path.join(directory, name)
+        write(table, path)
+        line(name, path, best_time(lambda: load(path), repeat))
+        line(f"  columns id,email", path, best_time(lambda: load(path, ['id', 'email']), repeat))
+        line(f"  + where", path, best_time(lambda: load(path, ['id', 'email'], where), repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert mock_data to Parquet/Arrow and load it back.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('convert', help='text file -> .parquet or .arrow')
+    p.add_argument('source', help='.csv, .tsv, .json, .ndjson, .xml or .sql')
+    p.add_argument('target', help='.parquet or .arrow')
+    p = commands.add_parser('show', help='print rows of a .parquet or .arrow file as CSV')
+    p.add_argument('path')
+    p.add_argument('-c', '--columns', help='comma-separated columns to read')
+    p.add_argument('-w', '--where', action='append', help="condition such as 'dob>=1995-01-01'; repeat to AND")
+    p.add_argument('-n', '--limit', type=int, help='print at most this many rows')
+    p.add_argument('--schema', action='store_true', help='print the schema instead of rows')
+    p = commands.add_parser('bench', help='load time and size against the text formats')
+    p.add_argument('--rows', type=int, help='use a synthetic dataset of this many rows')
+    p.add_argument('--dir', help='where to write the files (default: a temporary directory)')
+    p.add_argument('--repeat', type=int, help='best of this many runs (default 20, or 1 with --rows)')
+    args = parser.parse_args()
+
+    if pa is None:
+        sys.exit("columnar.py needs pyarrow: pip install pyarrow")
+    try:
+        if args.command == 'convert':
+            start = time.perf_counter()
+            table = convert(args.source, args.target)
+            print(f"{args.source} -> {args.target}: {table.num_rows} rows, "
+                  f"{os.path.getsize(args.source):,} -> {os.path.getsize(args.target):,} bytes "
+                  f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+            print(table.schema, file=sys.stderr)
+        elif args.command == 'show':
+            columns = args.columns.split(',') if args.columns else None
+            table = load(args.path, columns, args.where)
+            if args.schema:
+                print(table.schema)
+                return
+            if args.limit is not None:
+                table = table.slice(0, args.limit)
+            pacsv.write_csv(table, sys.stdout.buffer)
+        else:
+            repeat = args.repeat or (1 if args.rows else 20)
+            if args.dir:
+                os.makedirs(args.dir, exist_ok=True)
+                bench(args.dir, args.rows, repeat)
+            else:
+                with tempfile.TemporaryDirectory() as directory:
+                    bench(directory, args.rows, repeat)
+    except (ValueError, pa.ArrowInvalid) as e:
+        sys.exit(f"columnar.py: {e}")
+
+
+if __name__ == '__main__':
+    main()
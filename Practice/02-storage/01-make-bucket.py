@@ -1,4 +1,10 @@
 #!/usr/bin/python3
 
-import boto3
+import sys
+import s3tool
 
+# Make a new bucket: ./01-make-bucket.py mybucket3
+# Bucket names must be globally unique across all AWS customers.
+bucket = sys.argv[1]
+s3tool.make_bucket(bucket)
+print(f"make_bucket: {bucket}")
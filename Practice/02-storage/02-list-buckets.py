@@ -1,4 +1,7 @@
 #!/usr/bin/python3
 
-import boto3
+import s3tool
 
+# List every bucket in the account
+for bucket in s3tool.list_buckets():
+    print(bucket)
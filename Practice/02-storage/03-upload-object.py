@@ -1,4 +1,12 @@
 #!/usr/bin/python3
 
-import boto3
+import sys
+import s3tool
 
+# Upload a file: ./03-upload-object.py local-file.txt mybucket1 [key]
+# Large files are sent as a multipart upload, several parts at a time.
+path = sys.argv[1]
+bucket = sys.argv[2]
+key = sys.argv[3] if len(sys.argv) > 3 else None
+key = s3tool.upload(path, bucket, key)
+print(f"upload: {path} to s3://{bucket}/{key}")
@@ -1,4 +1,12 @@
 #!/usr/bin/python3
 
-import boto3
+import sys
+import s3tool
 
+# List the objects in a bucket: ./04-list-objects.py mybucket1 [prefix]
+# list_objects() pages through the results, so buckets with more than
+# 1000 objects are listed completely.
+bucket = sys.argv[1]
+prefix = sys.argv[2] if len(sys.argv) > 2 else ''
+for obj in s3tool.list_objects(bucket, prefix):
+    print(f"{obj['LastModified']:%Y-%m-%d %H:%M:%S} {obj['Size']:>10} {obj['Key']}")
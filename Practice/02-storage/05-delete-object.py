@@ -1,4 +1,12 @@
 #!/usr/bin/python3
 
-import boto3
+import sys
+import s3tool
 
+# Delete objects: ./05-delete-object.py mybucket1 file-not-wanted.pdf [more keys...]
+# The keys are removed with delete_objects, up to 1000 per request.
+bucket = sys.argv[1]
+deleted, errors = s3tool.delete_objects(bucket, sys.argv[2:])
+for error in errors:
+    print(f"failed: {error['Key']}: {error['Message']}")
+print(f"deleted {deleted} objects")
@@ -1,4 +1,11 @@
 #!/usr/bin/python3
 
-import boto3
+import sys
+import s3tool
 
+# Remove a bucket: ./06-delete-bucket.py mybucket3 [--force]
+# A bucket must be empty before it can be removed; --force deletes its
+# objects first.
+bucket = sys.argv[1]
+s3tool.delete_bucket(bucket, force='--force' in sys.argv[2:])
+print(f"remove_bucket: {bucket}")
@@ -1,27 +1,205 @@
 #!/Users/nem2p/.pyenv/versions/3.12.2/bin/python3.12
 
+# Presigned URLs for one key or many.
+#
+#   ./presign.py                                   # the bundle below, 30 seconds
+#   ./presign.py -b mybucket1 a.txt b.txt -e 600   # one URL per line, in order
+#   ./presign.py -b mybucket1 -e 600 < keys.txt    # keys from stdin
+#   ./presign.py --bench 20000                     # URLs/sec, no network needed
+#
+# Signing happens locally with the shared client from s3tool.py. A URL is
+# cached and handed out again until it gets close to expiring, so asking
+# for the same link many times a minute does not re-sign it.
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import boto3
 from botocore.exceptions import ClientError
+from s3tool import get_client
 
 bucket = "ds2002-resources"
 object = "zips/bundle.zip"
 exp_in = 30
 
-def presign_url(bucket, object, expiration=exp_in):
-    # Generate a presigned URL for the S3 object
-    s3 = boto3.client('s3')
+# A cached URL is reused until it has less than this share of its lifetime left
+REFRESH_MARGIN = 0.2
+CACHE_MAX_ENTRIES = 100000
+
+# Batches with at least this many uncached keys are signed by several processes
+PARALLEL_MIN = 2000
+
+
+class PresignCache:
+    """Presigned URLs by (bucket, key, expiration), least recently used evicted first."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, margin=REFRESH_MARGIN):
+        self.max_entries = max_entries
+        self.margin = margin
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bucket, key, expiration):
+        with self._lock:
+            entry = self._urls.get((bucket, key, expiration))
+            if entry is not None and entry[1] > time.time():
+                self._urls.move_to_end((bucket, key, expiration))
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def set(self, bucket, key, expiration, url, signed_at):
+        # reuse until `margin` of the lifetime is left, so a link handed
+        # out from the cache is still good for a while
+        reuse_until = signed_at + expiration * (1 - self.margin)
+        with self._lock:
+            self._urls[(bucket, key, expiration)] = (url, reuse_until)
+            self._urls.move_to_end((bucket, key, expiration))
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+
+
+cache = PresignCache()
+
+
+def _sign(bucket, object, expiration, use_cache):
+    # Generate a presigned URL for the S3 object with the shared client;
+    # None (and the error logged) if it can't be signed
+    s3 = get_client()
+    signed_at = time.time()
     try:
         response = s3.generate_presigned_url(
             'get_object',
             Params={'Bucket': bucket, 'Key': object},
-            ExpiresIn=exp_in
+            ExpiresIn=expiration
             )
     except ClientError as e:
-        return e
+        logging.error(e)
+        return None
 
     # The response contains the presigned URL
-    print(response)
+    if use_cache:
+        cache.set(bucket, object, expiration, response, signed_at)
+    return response
+
+
+def presign_url(bucket, object, expiration=exp_in, use_cache=True):
+    """A presigned GET URL for the object, or None if it can't be signed."""
+    if use_cache:
+        url = cache.get(bucket, object, expiration)
+        if url is not None:
+            return url
+    return _sign(bucket, object, expiration, use_cache)
+
+
+def _sign_chunk(args):
+    # runs in a worker process, which creates its own client once; a key
+    # that can't be signed is logged and comes back as None, as in _sign()
+    bucket, keys, expiration = args
+    s3 = get_client()
+    urls = []
+    for k in keys:
+        try:
+            urls.append(s3.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': k},
+                                                  ExpiresIn=expiration))
+        except ClientError as e:
+            logging.error(e)
+            urls.append(None)
+    return urls
+
+
+def presign_many(bucket, keys, expiration=exp_in, workers=4, use_cache=True):
+    """Presigned URLs for `keys`, in the same order (None where signing failed)."""
+    keys = list(keys)
+    urls = [cache.get(bucket, k, expiration) if use_cache else None for k in keys]
+    missing = [i for i, url in enumerate(urls) if url is None]
+    if workers <= 1 or len(missing) < PARALLEL_MIN:
+        # already looked up in the cache above, so sign directly
+        for i in missing:
+            urls[i] = _sign(bucket, keys[i], expiration, use_cache)
+        return urls
+
+    # signing is CPU work that holds the GIL, so big batches are split
+    # across processes rather than threads
+    signed_at = time.time()
+    size = -(-len(missing) // workers)
+    parts = [missing[j:j + size] for j in range(0, len(missing), size)]
+    with ProcessPoolExecutor(workers) as pool:
+        signed = pool.map(_sign_chunk, [(bucket, [keys[i] for i in part], expiration) for part in parts])
+        for part, part_urls in zip(parts, signed):
+            for i, url in zip(part, part_urls):
+                urls[i] = url
+                if use_cache and url is not None:
+                    cache.set(bucket, keys[i], expiration, url, signed_at)
+    return urls
+
+
+def bench(n, workers):
+    # signing needs credentials but no network, so made-up ones will do
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    keys = [f"bench/{i}.bin" for i in range(n)]
+
+    def report(name, count, elapsed):
+        print(f"{name:<30} {count:>8} URLs {elapsed:8.3f}s {count / elapsed:10.0f} URLs/s")
+
+    # the old way: a new client for every URL
+    count = min(n, 200)
+    start = time.perf_counter()
+    for k in keys[:count]:
+        boto3.client('s3').generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': k},
+                                                  ExpiresIn=exp_in)
+    report('new client per URL', count, time.perf_counter() - start)
+
+    get_client()
+    start = time.perf_counter()
+    presign_many(bucket, keys, 3600, workers=1, use_cache=False)
+    report('shared client', n, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    presign_many(bucket, keys, 3600, workers=workers, use_cache=False)
+    report(f'shared client, {workers} processes', n, time.perf_counter() - start)
+
+    cache.clear()
+    presign_many(bucket, keys, 3600, workers=workers)
+    start = time.perf_counter()
+    presign_many(bucket, keys, 3600, workers=1)
+    report('cached', n, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print presigned GET URLs for S3 objects.')
+    parser.add_argument('keys', nargs='*', help='object keys (default: read from stdin, or the bundle)')
+    parser.add_argument('-b', '--bucket', default=bucket)
+    parser.add_argument('-e', '--expires-in', type=int, default=exp_in, help='seconds')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='processes for big batches')
+    parser.add_argument('--bench', type=int, metavar='N', help='time N URLs instead')
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, args.workers)
+        return
+    keys = args.keys
+    if not keys:
+        keys = [line.strip() for line in sys.stdin if line.strip()] if not sys.stdin.isatty() else [object]
+    urls = presign_many(args.bucket, keys, args.expires_in, args.workers)
+    # a key that could not be signed gets an empty line, so lines still
+    # match keys; the error has been logged to stderr
+    sys.stdout.write(''.join(f"{url or ''}\n" for url in urls))
 
 
 if __name__ == "__main__":
-    presign_url(bucket, object, expiration=exp_in)
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/python3
+
+# A small S3 toolkit: make/remove buckets, list, upload, download, delete
+# and presign, from Python or the command line.
+#
+#   ./s3tool.py mb my-bucket
+#   ./s3tool.py ls                                  # buckets
+#   ./s3tool.py ls s3://my-bucket/folder1/          # objects under a prefix
+#   ./s3tool.py put bundle/folder1/1GB.file s3://my-bucket/folder1/
+#   ./s3tool.py get s3://my-bucket/folder1/1GB.file ./
+#   ./s3tool.py rm s3://my-bucket/folder1/ --recursive
+#   ./s3tool.py rb my-bucket --force
+#   ./s3tool.py presign s3://my-bucket/folder1/1GB.file --expires-in 600
+#   ./s3tool.py bench --moto --size-mb 64 --files 4
+#
+# Everything shares one boto3 client (clients are thread-safe, and creating
+# one is slow). Large files go up and down as multipart transfers with
+# several threads at once. Settings come from the environment:
+#
+#   S3_ENDPOINT_URL          e.g. http://localhost:9000 for MinIO (default: AWS)
+#   S3_CHUNK_SIZE_MB         multipart part size (default 16)
+#   S3_THRESHOLD_MB          files at least this big use multipart (default 16)
+#   S3_MAX_CONCURRENCY       threads per transfer (default 10)
+#   S3_MAX_POOL_CONNECTIONS  connections the client keeps open (default 50)
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+MB = 1024 * 1024
+ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+CHUNK_SIZE = int(float(os.getenv('S3_CHUNK_SIZE_MB', 16)) * MB)
+THRESHOLD = int(float(os.getenv('S3_THRESHOLD_MB', 16)) * MB)
+MAX_CONCURRENCY = int(os.getenv('S3_MAX_CONCURRENCY', 10))
+MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 50))
+
+# delete_objects takes at most this many keys per request
+DELETE_BATCH = 1000
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_client():
+    """The shared S3 client, created on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                # enough pooled connections for several files' transfer threads
+                config = Config(max_pool_connections=MAX_POOL_CONNECTIONS,
+                                retries={'max_attempts': 5, 'mode': 'adaptive'})
+                _client = boto3.client('s3', endpoint_url=ENDPOINT_URL, config=config)
+    return _client
+
+
+def transfer_config(chunk_size=CHUNK_SIZE, threshold=THRESHOLD, concurrency=MAX_CONCURRENCY):
+    return TransferConfig(multipart_threshold=threshold, multipart_chunksize=chunk_size,
+                          max_concurrency=concurrency, use_threads=concurrency > 1)
+
+
+def parse_url(url):
+    # s3://bucket/some/key -> ('bucket', 'some/key')
+    if not url.startswith('s3://'):
+        raise ValueError(f"not an s3:// URL: {url}")
+    bucket, _, key = url[5:].partition('/')
+    return bucket, key
+
+
+def make_bucket(bucket):
+    s3 = get_client()
+    region = s3.meta.region_name
+    if region in (None, 'us-east-1'):
+        # us-east-1 is the default and must not be named as a constraint
+        s3.create_bucket(Bucket=bucket)
+    else:
+        s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={'LocationConstraint': region})
+
+
+def list_buckets():
+    return [b['Name'] for b in get_client().list_buckets()['Buckets']]
+
+
+def list_objects(bucket, prefix=''):
+    """Every object under `prefix`, a page (up to 1000 keys) at a time."""
+    paginator = get_client().get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield from page.get('Contents', [])
+
+
+def upload(path, bucket, key=None, config=None):
+    key = key or os.path.basename(path)
+    get_client().upload_file(path, bucket, key, Config=config or transfer_config())
+    return key
+
+
+def local_path(directory, key, prefix=''):
+    """Where `key` goes under `directory`: its path below the last / of `prefix`."""
+    # s3://bucket/files/a/b.txt fetched with prefix files/ -> directory/a/b.txt
+    base = prefix[:prefix.rfind('/') + 1]
+    relative = key[len(base):] if key.startswith(base) else key
+    path = os.path.normpath(os.path.join(directory, *relative.strip('/').split('/')))
+    if os.path.commonpath([os.path.abspath(directory), os.path.abspath(path)]) != os.path.abspath(directory):
+        raise ValueError(f"key {key!r} would be written outside {directory!r}")
+    return path
+
+
+def download(bucket, key, path=None, config=None):
+    path = path or os.path.basename(key)
+    if os.path.isdir(path):
+        path = os.path.join(path, os.path.basename(key))
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    get_client().download_file(bucket, key, path, Config=config or transfer_config())
+    return path
+
+
+def upload_many(paths, bucket, prefix='', workers=4, config=None):
+    # whole files in parallel on top of the parts in parallel within each file
+    with ThreadPoolExecutor(workers) as pool:
+        jobs = [pool.submit(upload, p, bucket, prefix + os.path.basename(p), config) for p in paths]
+        return [job.result() for job in jobs]
+
+
+def download_many(bucket, keys, directory='.', workers=4, config=None, prefix=''):
+    # keys keep their path below `prefix`, so a/x.csv and b/x.csv don't
+    # overwrite each other; "folder" placeholder keys ending in / are skipped
+    with ThreadPoolExecutor(workers) as pool:
+        jobs = [pool.submit(download, bucket, k, local_path(directory, k, prefix), config)
+                for k in keys if not k.endswith('/')]
+        return [job.result() for job in jobs]
+
+
+def delete_objects(bucket, keys):
+    """Delete `keys` with one request per 1000; returns (deleted, errors)."""
+    s3 = get_client()
+    deleted, errors = 0, []
+    batch = []
+
+    def flush():
+        nonlocal deleted
+        response = s3.delete_objects(Bucket=bucket, Delete={'Objects': batch, 'Quiet': True})
+        # quiet mode only reports the failures
+        errors.extend(response.get('Errors', []))
+        deleted += len(batch) - len(response.get('Errors', []))
+
+    for key in keys:
+        batch.append({'Key': key})
+        if len(batch) == DELETE_BATCH:
+            flush()
+            batch = []
+    if batch:
+        flush()
+    return deleted, errors
+
+
+def delete_prefix(bucket, prefix=''):
+    return delete_objects(bucket, (obj['Key'] for obj in list_objects(bucket, prefix)))
+
+
+def delete_bucket(bucket, force=False):
+    if force:
+        delete_prefix(bucket)
+    get_client().delete_bucket(Bucket=bucket)
+
+
+def presign(bucket, key, expiration=3600, method='get_object'):
+    return get_client().generate_presigned_url(method, Params={'Bucket': bucket, 'Key': key},
+                                               ExpiresIn=expiration)
+
+
+def bench(size_mb, files, workers, chunk_mb, concurrency):
+    # upload and download `files` random files of `size_mb` each, first one
+    # part at a time and then as tuned multipart transfers
+    import tempfile
+    bucket = f"s3tool-bench-{int(time.time())}"
+    make_bucket(bucket)
+    total = size_mb * files
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(files):
+            path = os.path.join(tmp, f"bench-{i}.bin")
+            with open(path, 'wb') as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(MB))
+            paths.append(path)
+        out = os.path.join(tmp, 'out')
+        os.mkdir(out)
+
+        runs = [
+            ('sequential, single stream', 1, transfer_config(threshold=size_mb * MB + 1, concurrency=1)),
+            (f'{workers} files x {concurrency} parts of {chunk_mb} MB', workers,
+             transfer_config(chunk_size=int(chunk_mb * MB), threshold=int(chunk_mb * MB), concurrency=concurrency)),
+        ]
+        for name, n, config in runs:
+            start = time.perf_counter()
+            keys = upload_many(paths, bucket, 'bench/', n, config)
+            up = time.perf_counter() - start
+            start = time.perf_counter()
+            download_many(bucket, keys, out, n, config)
+            down = time.perf_counter() - start
+            print(f"{name:<32} upload {total / up:8.1f} MB/s   download {total / down:8.1f} MB/s")
+            delete_prefix(bucket, 'bench/')
+    delete_bucket(bucket, force=True)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='S3 buckets and objects, with concurrent transfers.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('mb', help='make a bucket')
+    p.add_argument('bucket')
+    p = sub.add_parser('rb', help='remove a bucket')
+    p.add_argument('bucket')
+    p.add_argument('--force', action='store_true', help='delete its objects first')
+    p = sub.add_parser('ls', help='list buckets, or objects under s3://bucket/prefix')
+    p.add_argument('url', nargs='?')
+    p = sub.add_parser('put', help='upload files to s3://bucket/prefix/')
+    p.add_argument('files', nargs='+')
+    p.add_argument('url')
+    p.add_argument('-w', '--workers', type=int, default=4, help='files at once')
+    p = sub.add_parser('get', help='download s3://bucket/key (or a prefix with --recursive)')
+    p.add_argument('url')
+    p.add_argument('dest', nargs='?', default='.')
+    p.add_argument('--recursive', action='store_true')
+    p.add_argument('-w', '--workers', type=int, default=4, help='files at once')
+    p = sub.add_parser('rm', help='delete s3://bucket/key (or a prefix with --recursive)')
+    p.add_argument('url')
+    p.add_argument('--recursive', action='store_true')
+    p = sub.add_parser('presign', help='print a presigned URL for s3://bucket/key')
+    p.add_argument('url')
+    p.add_argument('--expires-in', type=int, default=3600, help='seconds')
+    p = sub.add_parser('bench', help='measure upload/download throughput in a scratch bucket')
+    p.add_argument('--size-mb', type=int, default=64)
+    p.add_argument('--files', type=int, default=4)
+    p.add_argument('-w', '--workers', type=int, default=4)
+    p.add_argument('--chunk-mb', type=float, default=CHUNK_SIZE / MB)
+    p.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY)
+    p.add_argument('--moto', action='store_true', help='run against a local moto server')
+    args = parser.parse_args()
+
+    if args.command == 'mb':
+        make_bucket(args.bucket)
+    elif args.command == 'rb':
+        delete_bucket(args.bucket, args.force)
+    elif args.command == 'ls':
+        if not args.url:
+            print('\n'.join(list_buckets()))
+        else:
+            bucket, prefix = parse_url(args.url)
+            for obj in list_objects(bucket, prefix):
+                print(f"{obj['LastModified']:%Y-%m-%d %H:%M:%S} {obj['Size']:>12} {obj['Key']}")
+    elif args.command == 'put':
+        bucket, prefix = parse_url(args.url)
+        for key in upload_many(args.files, bucket, prefix, args.workers):
+            print(f"upload: s3://{bucket}/{key}")
+    elif args.command == 'get':
+        bucket, key = parse_url(args.url)
+        keys = [o['Key'] for o in list_objects(bucket, key)] if args.recursive else [key]
+        if args.recursive:
+            os.makedirs(args.dest, exist_ok=True)
+            paths = download_many(bucket, keys, args.dest, args.workers, prefix=key)
+        else:
+            paths = [download(bucket, key, args.dest)]
+        for path in paths:
+            print(f"download: {path}")
+    elif args.command == 'rm':
+        bucket, key = parse_url(args.url)
+        if args.recursive:
+            deleted, errors = delete_prefix(bucket, key)
+        else:
+            deleted, errors = delete_objects(bucket, [key])
+        for error in errors:
+            print(f"failed: {error['Key']}: {error['Message']}", file=sys.stderr)
+        print(f"deleted {deleted} objects")
+        return 1 if errors else 0
+    elif args.command == 'presign':
+        print(presign(*parse_url(args.url), expiration=args.expires_in))
+    elif args.command == 'bench':
+        server = None
+        if args.moto:
+            global ENDPOINT_URL
+            import logging
+            from moto.server import ThreadedMotoServer
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            server = ThreadedMotoServer(port=5055, verbose=False)
+            server.start()
+            ENDPOINT_URL = 'http://127.0.0.1:5055'
+            os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+            os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+            os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        try:
+            bench(args.size_mb, args.files, args.workers, args.chunk_mb, args.concurrency)
+        finally:
+            if server:
+                server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,124 @@
 #!/usr/bin/python3
 
 # calculate using Lebniz formula
+#   pi = 4/1 - 4/3 + 4/5 - 4/7 + ...
+#
+#   ./picalc.py                        # 100M terms with the original loop
+#   ./picalc.py -e numpy -n 1000000000
+#   ./picalc.py -e parallel -w 8
+#   ./picalc.py --benchmark -n 20000000
 
-# Initialize denominator
-k = 1
- 
-# Initialize sum
-s = 0
- 
-# calc to 100M models
-for i in range(100000000):
-  # even index elements are positive
-  if i % 2 == 0:
-    s += 4/k
-  else:
-    # odd index elements are negative
-    s -= 4/k
- 
+import argparse
+import math
+import os
+import time
+from multiprocessing import Pool
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+TERMS = 100000000
+# terms per NumPy chunk: ~32 MB of float64 at a time
+CHUNK = 1 << 22
+
+
+def loop(start, end):
+  # the original: one branch per term
+  s = 0
   # denominator is odd
-  k += 2
-     
-print(s)
+  k = 2 * start + 1
+  for i in range(start, end):
+    # even index elements are positive
+    if i % 2 == 0:
+      s += 4/k
+    else:
+      # odd index elements are negative
+      s -= 4/k
+    k += 2
+  return s
+
+
+def branchfree(start, end):
+  # take the terms in +/- pairs, so there is nothing to decide per term
+  s = 0.0
+  if start % 2:
+    # begin on a negative term
+    s -= 4 / (2 * start + 1)
+    start += 1
+  last = end - (end - start) % 2
+  s += sum(4 / k - 4 / (k + 2) for k in range(2 * start + 1, 2 * last + 1, 4))
+  if last < end:
+    s += 4 / (2 * last + 1)
+  return s
+
+
+def vectorized(start, end, chunk=CHUNK):
+  # whole chunks of terms at a time, so memory stays bounded
+  s = 0.0
+  for lo in range(start, end, chunk):
+    hi = min(lo + chunk, end)
+    k = np.arange(2 * lo + 1, 2 * hi + 1, 2, dtype=np.float64)
+    # flip every other denominator, starting with the first odd index
+    k[(lo % 2 == 0)::2] *= -1
+    s += (4 / k).sum()
+  return s
+
+
+def _part(args):
+  engine, start, end = args
+  return ENGINES[engine](start, end)
+
+
+def parallel(start, end, workers=None):
+  # one slice of the range per process, each summed with NumPy when it
+  # is installed (the loop otherwise)
+  workers = workers or os.cpu_count()
+  # at least 1, or range() below fails for an empty range
+  step = max(1, -(-(end - start) // workers))
+  engine = 'numpy' if np is not None else 'branchfree'
+  parts = [(engine, lo, min(lo + step, end)) for lo in range(start, end, step)]
+  with Pool(workers) as pool:
+    return math.fsum(pool.map(_part, parts))
+
+
+ENGINES = {'loop': loop, 'branchfree': branchfree, 'numpy': vectorized, 'parallel': parallel}
+
+
+def calc(n, engine='loop', workers=None):
+  if engine == 'numpy' and np is None:
+    raise SystemExit("the numpy engine needs numpy: pip install numpy")
+  if engine == 'parallel':
+    return parallel(0, n, workers)
+  return ENGINES[engine](0, n)
+
+
+def benchmark(n, workers):
+  print(f"{'engine':<12} {'seconds':>9} {'terms/s':>14} {'error':>12}")
+  for engine in ENGINES:
+    if engine == 'numpy' and np is None:
+      print(f"{engine:<12} skipped (numpy is not installed)")
+      continue
+    start = time.perf_counter()
+    s = calc(n, engine, workers)
+    elapsed = time.perf_counter() - start
+    print(f"{engine:<12} {elapsed:9.3f} {n / elapsed:14,.0f} {abs(s - math.pi):12.3e}")
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Estimate pi with the Leibniz series.')
+  parser.add_argument('-n', '--terms', type=int, default=TERMS)
+  parser.add_argument('-e', '--engine', choices=ENGINES, default='loop')
+  parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='processes for -e parallel')
+  parser.add_argument('--benchmark', action='store_true', help='time every engine')
+  args = parser.parse_args()
+  if args.terms < 1:
+    parser.error('--terms must be at least 1')
+  if args.workers < 1:
+    parser.error('--workers must be at least 1')
+
+  if args.benchmark:
+    benchmark(args.terms, args.workers)
+  else:
+    print(calc(args.terms, args.engine, args.workers))
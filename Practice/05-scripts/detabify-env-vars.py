@@ -1,23 +1,16 @@
 #!/usr/bin/env python3
 
-import io
-import re
 import os
+from detab_engine import convert_file
 
 input = os.getenv('INPUT')
 
 def convert(file_name):
-    # Open csv file
-    file_name="new_mock_data"
-
-    csv = io.open(file_name + ".csv", mode="w", encoding="utf-8")
+    # Fall back to the sample file when INPUT is not set
+    file_name = file_name or "new_mock_data"
 
     # Convert file_name.tsv to file_name.csv
-    with io.open(file_name + ".tsv", mode="r", encoding="utf-8") as tsv:
-        for line in tsv:
-            csv.write(re.sub('\t',',',re.sub('(^|[\t])([^\t]*\,[^\t\n]*)', r'\1"\2"', line)))
-
-    csv.close()
+    convert_file(file_name + ".tsv", file_name + ".csv")
 
 if __name__ == '__main__':
     print('Start converting ...')
@@ -1,19 +1,13 @@
 #!/usr/bin/env python3
 
-import io
-import re
-
-def convert(file_name):
-    # Open csv file
-
-    csv = io.open(file_name + ".csv", mode="w", encoding="utf-8")
+from detab_engine import convert_file
 
+def convert(file_name, workers=None, use_mmap=None):
     # Convert file_name.tsv to file_name.csv
-    with io.open(file_name + ".tsv", mode="r", encoding="utf-8") as tsv:
-        for line in tsv:
-            csv.write(re.sub('\t',',',re.sub('(^|[\t])([^\t]*\,[^\t\n]*)', r'\1"\2"', line)))
-
-    csv.close()
+    # The shared engine reads large chunks, quotes fields per RFC 4180
+    # and splits big files across worker processes. The largest files are
+    # read through mmap so memory use stays flat (use_mmap=True forces it).
+    convert_file(file_name + ".tsv", file_name + ".csv", workers=workers, use_mmap=use_mmap)
 
 if __name__ == '__main__':
     print('Start converting ...')
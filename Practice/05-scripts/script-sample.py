@@ -1,19 +1,26 @@
-1. shebang / executable
-2. error out / error codes
-3. input parameters
-4. conditional logic
-5. full paths
-6. logging
-7. comments!
-
+# 1. shebang / executable
+# 2. error out / error codes
+# 3. input parameters
+# 4. conditional logic
+# 5. full paths
+# 6. logging
+# 7. comments!
+#
+# For many patterns, many (or gzipped) files, or very large logs, see
+# logfilter.py, e.g.: python3 logfilter.py --ip 12.34.56.78 test_log.log
 
 #####
 
 import os
 import re
 
-# Regex used to match relevant loglines (in this case, a specific IP address)
-line_regex = re.compile(r".*fwd=\"12.34.56.78\".*$")
+# Regex used to match relevant loglines (in this case, a specific IP address).
+# search() finds it anywhere in the line, so no leading/trailing .* is needed,
+# and the dots are escaped so they only match a literal "."
+line_regex = re.compile(r"fwd=\"12\.34\.56\.78\"")
+# Fixed text every matching line contains: checking for it with `in` is much
+# cheaper than running the regex, so most lines never get that far
+must_contain = "12.34.56.78"
 
 # Output file, where the matched loglines will be copied to
 output_filename = os.path.normpath("parsed_lines.log")
@@ -27,7 +34,7 @@ with open(output_filename, "a") as out_file:
     with open("../input/test-log/test_log.log", "r") as in_file:
         # Loop over each log line
         for line in in_file:
-            # If log line matches our regex, print to console, and output file
-            if (line_regex.search(line)):
-                print(line)
+            # If log line matches our regex, write it to the output file
+            # (printing every match to the console slows this down a lot)
+            if must_contain in line and line_regex.search(line):
                 out_file.write(line)
@@ -0,0 +1,60 @@
+# Run with: python3 -m pytest test_logfilter.py
+#
+# logfilter.py must count the same lines as grep -P (Perl-style regexes, like
+# Python's), anchored patterns included.
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import logfilter
+from logfilter import filter_logs, generate, scan
+
+PATTERNS = [
+    r'^at=info',
+    r'^at=info.*status=500',
+    r'\d$',
+    r'status=404$',
+    r'fwd="12\.34\.56\.78"',
+    r'status=50[03]|login',
+]
+
+
+@pytest.fixture(scope='module')
+def log(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('logs') / 'access.log')
+    generate(path, 4)
+    return path
+
+
+def test_generate_stays_under_size(log):
+    size = os.path.getsize(log)
+    assert 4 * 1024 * 1024 - 300 < size <= 4 * 1024 * 1024
+
+
+@pytest.mark.skipif(shutil.which('grep') is None, reason='needs grep')
+@pytest.mark.parametrize('pattern', PATTERNS)
+@pytest.mark.parametrize('workers', [1, 2])
+def test_counts_match_grep(log, pattern, workers):
+    grep = subprocess.run(['grep', '-cP', pattern, log], capture_output=True, text=True)
+    assert filter_logs([log], [pattern], count_only=True, workers=workers)[log] == int(grep.stdout)
+
+
+@pytest.mark.skipif(shutil.which('grep') is None, reason='needs grep')
+def test_output_past_buffer_matches_grep(log, monkeypatch, tmp_path):
+    # matches beyond OUTPUT_BUFFER are written as they go (or spilled to a
+    # temporary file in a worker), still in input order
+    monkeypatch.setattr(logfilter, 'OUTPUT_BUFFER', 64 * 1024)
+    pattern = r'status=(200|404)'
+    grep = subprocess.run(['grep', '-P', pattern, log], capture_output=True).stdout
+    out = tmp_path / 'out.log'
+    with open(out, 'wb') as f:
+        filter_logs([log], [pattern], f, workers=1)
+    assert out.read_bytes() == grep
+
+    path, count, lines, spill = scan((log, 0, None, [pattern], False, False))
+    with open(spill, 'rb') as f:
+        assert f.read() + lines == grep
+    os.remove(spill)
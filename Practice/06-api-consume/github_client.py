@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+# A small GitHub REST client shared by the py-*.py scripts in this folder.
+#
+#   from github_client import GitHub
+#   gh = GitHub()                                       # token from GITHUB_TOKEN
+#   gh.get('/repos/nmagee/ds2002')                      # one JSON document
+#   for branch in gh.paginate('/repos/nmagee/ds2002/branches'):
+#       print(branch['name'])                           # every page, via Link headers
+#   asyncio.run(gh.fan_out(['/repos/nmagee/ds2002', '/repos/nmagee/ds3002']))
+#
+# - One requests.Session with a connection pool, reused for every call.
+# - GET responses are cached with their ETag / Last-Modified; asking again
+#   sends If-None-Match, and a 304 (which GitHub does not count against the
+#   rate limit) returns the cached data. The least recently used entries
+#   are dropped beyond `cache_size` URLs.
+# - When X-RateLimit-Remaining reaches 0, calls wait until X-RateLimit-Reset;
+#   a 403/429 with Retry-After (seconds or an HTTP date; secondary limits)
+#   waits that long and retries.
+# - GITHUB_API_URL points the client somewhere else, e.g. mock_github.py.
+#
+#   python3 github_client.py /repos/nmagee/ds2002/branches      # print JSON
+
+import asyncio
+import datetime
+import email.utils
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+
+# Longest we are willing to sleep for a rate limit before giving up
+MAX_RATE_LIMIT_WAIT = float(os.getenv('GITHUB_MAX_RATE_LIMIT_WAIT', 300))
+
+# URLs whose ETag / Last-Modified and data are kept for revalidation
+CACHE_MAX_ENTRIES = 1000
+
+
+def retry_after_seconds(value, default=60):
+    """Seconds to wait for a Retry-After header: a number, or an HTTP date."""
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        # '-0000' means UTC with no zone given
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0, when.timestamp() - time.time())
+
+
+class GitHubError(Exception):
+    def __init__(self, response):
+        self.status = response.status_code
+        self.response = response
+        try:
+            message = response.json().get('message', response.text)
+        except ValueError:
+            message = response.text
+        super().__init__(f"{response.request.method} {response.url}: {self.status} {message}")
+
+
+class GitHub:
+    def __init__(self, token=GITHUB_TOKEN, base_url=GITHUB_API_URL, pool_size=10,
+                 retries=3, max_wait=MAX_RATE_LIMIT_WAIT, cache_size=CACHE_MAX_ENTRIES):
+        self.base_url = base_url.rstrip('/')
+        self.retries = retries
+        self.max_wait = max_wait
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/vnd.github+json',
+                                     'X-GitHub-Api-Version': '2022-11-28'})
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+        # url -> (validators, data, next url), least recently used first;
+        # see get_page()
+        self._cache = OrderedDict()
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._blocked_until = 0
+        self.rate_limit = {}
+        self.stats = {'requests': 0, 'not_modified': 0, 'rate_limit_waits': 0}
+
+    def url(self, path):
+        return path if path.startswith('http') else self.base_url + '/' + path.lstrip('/')
+
+    def _wait_for_rate_limit(self):
+        delay = self._blocked_until - time.time()
+        if delay <= 0:
+            return
+        if delay > self.max_wait:
+            raise RuntimeError(f"GitHub rate limit exhausted for another {delay:.0f}s")
+        with self._lock:
+            self.stats['rate_limit_waits'] += 1
+        time.sleep(delay)
+
+    def _note_rate_limit(self, response):
+        headers = response.headers
+        if 'X-RateLimit-Remaining' not in headers:
+            return
+        with self._lock:
+            self.rate_limit = {
+                'limit': int(headers.get('X-RateLimit-Limit', 0)),
+                'remaining': int(headers['X-RateLimit-Remaining']),
+                'reset': int(headers.get('X-RateLimit-Reset', 0)),
+            }
+            if self.rate_limit['remaining'] == 0:
+                # a second of slack for clock differences
+                self._blocked_until = max(self._blocked_until, self.rate_limit['reset'] + 1)
+
+    def request(self, method, path, headers=None, **kwargs):
+        """Send one request, waiting out rate limits and retrying server errors."""
+        url = self.url(path)
+        for attempt in range(self.retries + 1):
+            self._wait_for_rate_limit()
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            with self._lock:
+                self.stats['requests'] += 1
+            self._note_rate_limit(response)
+
+            if response.status_code in (403, 429) and attempt < self.retries:
+                if 'Retry-After' in response.headers:
+                    delay = retry_after_seconds(response.headers['Retry-After'])
+                    with self._lock:
+                        self._blocked_until = time.time() + delay
+                    continue
+                if response.headers.get('X-RateLimit-Remaining') == '0':
+                    continue
+            if response.status_code >= 500 and attempt < self.retries:
+                time.sleep(2 ** attempt)
+                continue
+            break
+        if response.status_code >= 400:
+            raise GitHubError(response)
+        return response
+
+    def get_page(self, path, params=None):
+        """GET one page as (data, next url), revalidating any cached copy."""
+        url = requests.Request('GET', self.url(path), params=params).prepare().url
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached:
+                self._cache.move_to_end(url)
+        headers = {}
+        if cached:
+            headers.update(cached[0])
+        response = self.request('GET', url, headers=headers)
+        if response.status_code == 304:
+            with self._lock:
+                self.stats['not_modified'] += 1
+            return cached[1], cached[2]
+
+        data = response.json() if response.content else None
+        next_url = response.links.get('next', {}).get('url')
+        validators = {}
+        if 'ETag' in response.headers:
+            validators['If-None-Match'] = response.headers['ETag']
+        if 'Last-Modified' in response.headers:
+            validators['If-Modified-Since'] = response.headers['Last-Modified']
+        if validators:
+            with self._lock:
+                self._cache[url] = (validators, data, next_url)
+                self._cache.move_to_end(url)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return data, next_url
+
+    def get(self, path, params=None):
+        return self.get_page(path, params)[0]
+
+    def paginate(self, path, params=None, per_page=100):
+        """Yield every item of a list endpoint, following Link: rel="next"."""
+        params = dict(params or {}, per_page=per_page)
+        data, next_url = self.get_page(path, params)
+        while True:
+            yield from data
+            if not next_url:
+                return
+            data, next_url = self.get_page(next_url)
+
+    def post(self, path, data=None):
+        return self.request('POST', path, json=data).json()
+
+    def patch(self, path, data=None):
+        return self.request('PATCH', path, json=data).json()
+
+    def delete(self, path):
+        self.request('DELETE', path)
+
+    async def fan_out(self, paths, concurrency=8, all_pages=False):
+        """GET many paths concurrently; results come back in the same order.
+
+        The session is shared, so at most `concurrency` requests run at once
+        (keep it at or below the pool size).
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(path):
+            async with semaphore:
+                if all_pages:
+                    return await asyncio.to_thread(lambda: list(self.paginate(path)))
+                return await asyncio.to_thread(self.get, path)
+
+        return await asyncio.gather(*(one(p) for p in paths))
+
+    def close(self):
+        self.session.close()
+
+
+if __name__ == '__main__':
+    gh = GitHub()
+    for path in sys.argv[1:] or ['/rate_limit']:
+        print(json.dumps(gh.get(path), indent=2))
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+# A local stand-in for the parts of the GitHub API the scripts here use,
+# with pagination (Link headers), ETags, rate-limit headers and an optional
+# delay per request.
+#
+#   python3 mock_github.py --port 8765 --latency 50 &
+#   GITHUB_API_URL=http://localhost:8765 ./py-get.py
+#
+#   python3 mock_github.py --bench     # start it in-process and time the client
+#
+# Every repo has --branches branches. The rate limit allows --limit requests
+# per --window seconds; 304 Not Modified responses do not count.
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+class MockGitHub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, branches=250, limit=5000, window=3600, latency=0.0):
+        super().__init__(address, Handler)
+        self.branches = branches
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.used = 0
+        self.reset = int(time.time()) + window
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out as separate writes; without this, keep-alive
+    # clients wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, headers=None, count=True):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            if time.time() >= server.reset:
+                server.used, server.reset = 0, int(time.time()) + server.window
+            if count:
+                server.used += 1
+            remaining = max(server.limit - server.used, 0)
+            reset = server.reset
+        payload = b'' if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('X-RateLimit-Limit', str(server.limit))
+        self.send_header('X-RateLimit-Remaining', str(remaining))
+        self.send_header('X-RateLimit-Reset', str(reset))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def over_limit(self):
+        with self.server.lock:
+            return self.server.used >= self.server.limit and time.time() < self.server.reset
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.over_limit():
+            return self.send_json(403, {'message': 'API rate limit exceeded'}, count=False)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/rate_limit':
+            return self.send_json(200, {'rate': {'limit': self.server.limit}}, count=False)
+
+        m = re.fullmatch(r'/repos/([^/]+)/([^/]+)(/branches)?', url.path)
+        if not m:
+            return self.send_json(404, {'message': 'Not Found'})
+        owner, repo, branches = m.groups()
+        headers = {}
+        if branches:
+            per_page = min(int(query.get('per_page', ['30'])[0]), 100)
+            page = int(query.get('page', ['1'])[0])
+            start = (page - 1) * per_page
+            body = [{'name': f'branch-{i}', 'commit': {'sha': hashlib.sha1(str(i).encode()).hexdigest()}}
+                    for i in range(start, min(start + per_page, self.server.branches))]
+            if start + per_page < self.server.branches:
+                headers['Link'] = (f'<{self.server.base_url}{url.path}?per_page={per_page}&page={page + 1}>; '
+                                   f'rel="next"')
+        else:
+            body = {'name': repo, 'full_name': f'{owner}/{repo}',
+                    'html_url': f'https://github.com/{owner}/{repo}'}
+
+        etag = '"' + hashlib.md5(json.dumps(body).encode()).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            return self.send_json(304, None, {'ETag': etag}, count=False)
+        headers['ETag'] = etag
+        self.send_json(200, body, headers)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        if self.path == '/user/repos':
+            return self.send_json(201, {'name': data.get('name'),
+                                        'html_url': f"https://github.com/mock/{data.get('name')}"})
+        if self.path == '/gists':
+            return self.send_json(201, {'html_url': 'https://gist.github.com/mock/1'})
+        self.send_json(404, {'message': 'Not Found'})
+
+    def do_DELETE(self):
+        if re.fullmatch(r'/repos/[^/]+/[^/]+', self.path):
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_json(404, {'message': 'Not Found'})
+
+
+def start(port=0, **options):
+    server = MockGitHub(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench(repos, latency, concurrency):
+    import asyncio
+    import requests
+    from github_client import GitHub
+
+    server = start(latency=latency, branches=250)
+    paths = [f'/repos/mock/repo-{i}' for i in range(repos)]
+
+    def report(name, elapsed, count):
+        print(f"{name:<36} {elapsed:8.3f}s {count / elapsed:8.1f} req/s")
+
+    # the old scripts: requests.get() with a fresh connection each time
+    start_time = time.perf_counter()
+    for path in paths:
+        requests.get(server.base_url + path).json()
+    report('requests.get, one at a time', time.perf_counter() - start_time, repos)
+
+    gh = GitHub(token=None, base_url=server.base_url, pool_size=concurrency)
+    start_time = time.perf_counter()
+    for path in paths:
+        gh.get(path)
+    report('pooled session, one at a time', time.perf_counter() - start_time, repos)
+
+    gh = GitHub(token=None, base_url=server.base_url, pool_size=concurrency)
+    start_time = time.perf_counter()
+    asyncio.run(gh.fan_out(paths, concurrency))
+    report(f'pooled session, fan_out({concurrency})', time.perf_counter() - start_time, repos)
+
+    start_time = time.perf_counter()
+    asyncio.run(gh.fan_out(paths, concurrency))
+    report('again, answered with 304s', time.perf_counter() - start_time, repos)
+
+    before = server.requests
+    branches = list(gh.paginate('/repos/mock/ds2002/branches'))
+    print(f"paginate: {len(branches)} branches in {server.requests - before} requests; "
+          f"rate limit left {gh.rate_limit.get('remaining')}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a mock GitHub API, or benchmark the client against one.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--branches', type=int, default=250, help='branches per repo')
+    parser.add_argument('--limit', type=int, default=5000, help='requests per window')
+    parser.add_argument('--window', type=int, default=3600, help='rate limit window, seconds')
+    parser.add_argument('--latency', type=float, default=0, help='delay per GET, milliseconds')
+    parser.add_argument('--bench', action='store_true')
+    parser.add_argument('--repos', type=int, default=100, help='repos fetched by --bench')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.repos, (args.latency or 20) / 1000, args.concurrency)
+        return
+    server = MockGitHub(('127.0.0.1', args.port), args.branches, args.limit, args.window, args.latency / 1000)
+    print(f"mock GitHub API on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,18 @@
 #!/usr/bin/env python3
 
-import json
-import requests
-import os
+from github_client import GitHub, GitHubError
 
-token = os.getenv('GITHUB_TOKEN')
+# The client reads the token from GITHUB_TOKEN
+gh = GitHub()
 
-url = "https://api.github.com/user/repos"
 data = {"name": "another-new-repo"}
 
-headers = {'Accept': 'application/vnd.github.v3+json', 'Authorization': f'token {token}'}
-r = requests.post(url, headers=headers, data=json.dumps(data))
+try:
+    # post() sends the data as JSON and returns the parsed response
+    d = gh.post("/user/repos", data)
+except GitHubError as e:
+    raise SystemExit(f"Could not create the repo: {e}")
 
-# # Put the response into json to parse
-d = r.json()
 # # Grab the html_url value:
 link = d['html_url']
-print.f("Your new repo has been created: {link}")
+print(f"Your new repo has been created: {link}")
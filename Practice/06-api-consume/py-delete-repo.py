@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
 
-import json
-import requests
-import os
+from github_client import GitHub, GitHubError
 
-token = os.getenv('GITHUB_TOKEN')
+# The client reads the token from GITHUB_TOKEN
+gh = GitHub()
 
-url = "https://api.github.com/repos/nmagee/my-new-repo"
-data = {"name": "my-new-repo"}
+repo = "nmagee/my-new-repo"
 
-headers = {'Accept': 'application/vnd.github.v3+json', 'Authorization': f'token {token}'}
-r = requests.delete(url, headers=headers)
-print(r.text)
\ No newline at end of file
+try:
+    # a successful delete returns 204 No Content
+    gh.delete(f"/repos/{repo}")
+except GitHubError as e:
+    raise SystemExit(f"Could not delete {repo}: {e}")
+print(f"Deleted {repo}")
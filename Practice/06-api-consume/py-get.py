@@ -1,29 +1,32 @@
 #!/usr/bin/env python3
 
-import requests
+from github_client import GitHub
 
 
 #  Fetching remote HTTP resources in Python requires a library.
-#  One of the most common is the `requests` library.
+#  One of the most common is the `requests` library; github_client.py
+#  wraps it with a pooled session, pagination, caching and rate limits.
 
-#  Set up the base URL for the request:
-url = 'https://api.github.com/repos/nmagee/ds3002/branches'
+#  Set up the path for the request (relative to https://api.github.com):
+path = '/repos/nmagee/ds3002/branches'
 
-#  Declare a variable that will contain the requests.get response:
-response = requests.get(url)
+#  The client reuses one session (and its connections) for every request:
+gh = GitHub()
 
 
-#  We now have a lot of data back from the remote API:
+#  Each response carries a lot more than the body. The client keeps
+#  track of some of it for us:
+# print(gh.rate_limit)          #   <-- X-RateLimit-* headers of the last response
+# print(gh.stats)               #   <-- requests sent, 304s, rate limit waits
+#
+#  and gh.request('GET', path) returns the raw requests.Response:
+# response = gh.request('GET', path)
 # print(response.headers)       #   <-- the headers of the response
 # print(response.status_code)   #   <-- the HTTP code of the response
 # print(response.json())        #   <-- the json body of the response
-# print(response.encoding)      #   <-- the text encoding of the response
-# print(response.text)          #   <-- plain text of the response body
 
 
-# Load the response into json
-data = response.json()
-
-# Finally, iterate over the records and print out the 'name' field:
-for r in data:
+# Finally, iterate over the records and print out the 'name' field.
+# paginate() follows the Link headers, so this covers every page of branches.
+for r in gh.paginate(path):
   print(r['name'])
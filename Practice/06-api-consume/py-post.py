@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 
-import json
-import requests
-import os
+from github_client import GitHub, GitHubError
 
 ## Setup
 ##
@@ -18,9 +16,9 @@ import os
 ## Now we'll use the Github token to authenticate you to and create a
 ## simple gist.
 
-token = os.getenv('GITHUB_TOKEN')
+## The client reads the token from GITHUB_TOKEN
+gh = GitHub()
 
-url = "https://api.github.com/gists"
 data = {
     "public": True,
     "files": {
@@ -29,15 +27,15 @@ data = {
         },
     }
 }
-headers = {'Authorization': f'token {token}'}
-r = requests.post(url, headers=headers, data=json.dumps(data))
-# print(r.json())
+try:
+    # post() sends the data as JSON and returns the parsed response
+    d = gh.post("/gists", data)
+except GitHubError as e:
+    raise SystemExit(f"Could not create the gist: {e}")
 
 ## Visit this URL and you can see your new gist:
 print("Your new gist has been created: ")
 
-# Put the response into json to parse
-d = r.json()
 # Grab the html_url value:
 link = d['html_url']
 print(link)
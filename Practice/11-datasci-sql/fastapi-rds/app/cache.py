@@ -0,0 +1,324 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Cache settings, overridable from the environment
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 256))
+CACHE_MAX_FIELDS = int(os.environ.get('CACHE_MAX_FIELDS', 64))
+CACHE_CURRENT_TTL = float(os.environ.get('CACHE_CURRENT_TTL', 60))
+CACHE_STALE_TTL = float(os.environ.get('CACHE_STALE_TTL', 30))
+CACHE_NEGATIVE_TTL = float(os.environ.get('CACHE_NEGATIVE_TTL', 10))
+REDIS_URL = os.environ.get('REDIS_URL')
+
+
+class LRUCache:
+    """A bounded in-process cache of entries that each hold named fields.
+
+    An entry (for example one month of tracking data) is a small dict of
+    fields (for example one page of that month). Entries are evicted least
+    recently used first once there are more than `max_entries` of them. An
+    entry whose fields were set with a ttl expires when the longest of those
+    has run out, counted from each field's set. Deleting an entry drops all
+    of its fields at once.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_fields=CACHE_MAX_FIELDS):
+        self.max_entries = max_entries
+        self.max_fields = max_fields
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key, field):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry['expires'] is not None and entry['expires'] <= time.monotonic():
+                del self._data[key]
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None or field not in entry['fields']:
+                self._stats['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry['fields'][field]
+
+    def set(self, key, field, value, ttl=None):
+        with self._lock:
+            entry = self._data.get(key)
+            expires = None if ttl is None else time.monotonic() + ttl
+            if entry is None:
+                entry = self._data[key] = {'expires': expires, 'fields': OrderedDict()}
+            elif entry['expires'] is not None and expires is not None:
+                # a refreshed field keeps the entry alive; its own age is
+                # checked by the caller (see ReadThrough)
+                entry['expires'] = max(entry['expires'], expires)
+            entry['fields'][field] = value
+            if len(entry['fields']) > self.max_fields:
+                entry['fields'].popitem(last=False)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._data)
+        stats['backend'] = 'memory'
+        stats['max_entries'] = self.max_entries
+        return stats
+
+
+class RedisCache:
+    """The same interface backed by Redis hashes, shared by every worker.
+
+    Values are stored as JSON, so they must be JSON-serializable and come
+    back with tuples as lists. Eviction is left to the server's maxmemory
+    policy (use allkeys-lru).
+    """
+
+    def __init__(self, client, prefix='fastapi-rds:'):
+        self.client = client
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key, field):
+        raw = self.client.hget(self.prefix + key, field)
+        if raw is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(raw)
+
+    def set(self, key, field, value, ttl=None):
+        name = self.prefix + key
+        pipe = self.client.pipeline()
+        pipe.hset(name, field, json.dumps(value))
+        if ttl is not None:
+            # like the in-memory cache: set a ttl on a new entry, or extend it
+            seconds = max(1, round(ttl))
+            pipe.expire(name, seconds, nx=True)
+            pipe.expire(name, seconds, gt=True)
+        pipe.execute()
+
+    def delete(self, key):
+        if self.client.delete(self.prefix + key):
+            self._count('invalidations')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        info = self.client.info('stats')
+        stats['evictions'] = info.get('evicted_keys', 0)
+        stats['expirations'] = info.get('expired_keys', 0)
+        stats['backend'] = 'redis'
+        return stats
+
+
+def make_cache():
+    # Redis when REDIS_URL is set (needed to share invalidations between
+    # several workers), otherwise an in-process LRU cache
+    if REDIS_URL:
+        import redis
+        return RedisCache(redis.Redis.from_url(REDIS_URL))
+    return LRUCache()
+
+
+cache = make_cache()
+
+# every ReadThrough by name, for /stats/cache and /metrics
+loaders = {}
+
+
+class ReadThrough:
+    """A slow loader answered from a cache, for use as a decorator.
+
+    `key(*args, **kwargs)` maps a call to the (key, field) it is cached
+    under. Values are stored as (value, fresh until, negative) so that:
+
+    - concurrent misses for the same (key, field) share one call to the
+      loader (single-flight) instead of all hitting the database;
+    - a result for which `is_negative` is true (by default None) is cached
+      for `negative_ttl` seconds, or not at all if that is None;
+    - once a value is older than its ttl it is still served for up to
+      `stale` more seconds while one background call refreshes it
+      (stale-while-revalidate);
+    - hits, stale hits, misses, coalesced calls, loads, errors and load
+      times are counted in stats().
+
+    `ttl` is seconds, None for no expiry, or a callable taking the same
+    arguments as the loader.
+    """
+
+    def __init__(self, loader, key, backend=None, ttl=None, stale=0,
+                 negative_ttl=None, is_negative=None, name=None):
+        self.loader = loader
+        self.key = key
+        self.backend = backend or cache
+        self.ttl = ttl
+        self.stale = stale
+        self.negative_ttl = negative_ttl
+        self.is_negative = is_negative or (lambda value: value is None)
+        self.name = name or loader.__name__
+        self._lock = threading.Lock()
+        # (key, field, generation) -> Future of the load in progress
+        self._inflight = {}
+        # bumped by invalidate() while a load of the key is in flight, so
+        # that load neither puts its now out-of-date result back in the
+        # cache nor is joined by later calls; dropped once none is
+        self._generations = {}
+        self._stats = {'hits': 0, 'stale_hits': 0, 'negative_hits': 0, 'misses': 0, 'coalesced': 0,
+                       'loads': 0, 'load_errors': 0, 'refreshes': 0,
+                       'load_seconds_total': 0.0, 'load_seconds_max': 0.0}
+        loaders[self.name] = self
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def __call__(self, *args, **kwargs):
+        key, field = self.key(*args, **kwargs)
+        stored = self.backend.get(key, field)
+        if stored is not None:
+            value, fresh_until, negative = stored
+            now = time.time()
+            if fresh_until is None or now < fresh_until:
+                self._count('negative_hits' if negative else 'hits')
+                return value
+            if not negative and now < fresh_until + self.stale:
+                self._count('stale_hits')
+                self._refresh(key, field, args, kwargs)
+                return value
+        self._count('misses')
+        return self._load(key, field, args, kwargs)
+
+    def _load(self, key, field, args, kwargs):
+        with self._lock:
+            generation = self._generations.get(key, 0)
+            inflight = (key, field, generation)
+            future = self._inflight.get(inflight)
+            leader = future is None
+            if leader:
+                future = self._inflight[inflight] = Future()
+            else:
+                self._stats['coalesced'] += 1
+        if not leader:
+            return future.result()
+
+        start = time.perf_counter()
+        try:
+            try:
+                value = self.loader(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._stats['loads'] += 1
+                    self._stats['load_seconds_total'] += elapsed
+                    self._stats['load_seconds_max'] = max(self._stats['load_seconds_max'], elapsed)
+            # still in _inflight here, so _store() sees this generation
+            self._store(key, field, value, generation, args, kwargs)
+        except BaseException as e:
+            self._count('load_errors')
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[inflight]
+                if not self._loading(key):
+                    self._generations.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def _loading(self, key):
+        # call with self._lock held
+        return any(k == key for k, _, _ in self._inflight)
+
+    def _store(self, key, field, value, generation, args, kwargs):
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return
+        if self.is_negative(value):
+            if self.negative_ttl is None:
+                return
+            self.backend.set(key, field, (value, time.time() + self.negative_ttl, True), ttl=self.negative_ttl)
+            return
+        ttl = self.ttl(*args, **kwargs) if callable(self.ttl) else self.ttl
+        if ttl is None:
+            self.backend.set(key, field, (value, None, False))
+        else:
+            # the backend keeps it through the stale window as well
+            self.backend.set(key, field, (value, time.time() + ttl, False), ttl=ttl + self.stale)
+
+    def _refresh(self, key, field, args, kwargs):
+        with self._lock:
+            if (key, field, self._generations.get(key, 0)) in self._inflight:
+                return
+            self._stats['refreshes'] += 1
+
+        def run():
+            try:
+                self._load(key, field, args, kwargs)
+            except Exception:
+                pass  # counted in load_errors; the stale value stays until it expires
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def invalidate(self, key):
+        """Drop every cached field of key, including loads still in flight."""
+        with self._lock:
+            # with no load in flight there is nothing to fence off
+            if self._loading(key):
+                self._generations[key] = self._generations.get(key, 0) + 1
+        self.backend.delete(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats['hits'] + stats['stale_hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = round((calls - stats['misses']) / calls, 4) if calls else None
+        stats['load_seconds_avg'] = stats['load_seconds_total'] / stats['loads'] if stats['loads'] else None
+        return stats
+
+
+def read_through(key, backend=None, ttl=None, stale=0, negative_ttl=None, is_negative=None, name=None):
+    """Decorator form of ReadThrough:
+
+        @read_through(key=lambda user_id: ('users', str(user_id)), ttl=300, negative_ttl=10)
+        def load_user(user_id):
+            ...                     # the slow lookup, run only on a miss
+
+    load_user.invalidate('users') drops what has been cached.
+    """
+    def wrap(loader):
+        wrapper = ReadThrough(loader, key, backend, ttl, stale, negative_ttl, is_negative, name)
+        functools.update_wrapper(wrapper, loader)
+        return wrapper
+    return wrap
+
+
+def metrics_text():
+    """Cache and loader counters in the Prometheus text format."""
+    lines = []
+    for name, value in cache.stats().items():
+        if isinstance(value, (int, float)):
+            lines.append(f'cache_{name} {value}')
+    for loader, reader in loaders.items():
+        for name, value in reader.stats().items():
+            if isinstance(value, (int, float)):
+                lines.append(f'read_through_{name}{{loader="{loader}"}} {value}')
+    return '\n'.join(lines) + '\n'
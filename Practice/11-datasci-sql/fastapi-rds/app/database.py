@@ -1,4 +1,7 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
 import MySQLdb
 
 DB_NAME = 'ds3002'
@@ -6,9 +9,203 @@ HOST = 'ds3002-rds.cqee4iwdcaph.us-east-1.rds.amazonaws.com'
 USER = 'ds3002'
 PASS = os.environ.get('RDS_PASS')
 
-db = MySQLdb.connect(
-    host=HOST,
-    user=USER,
-    passwd=PASS,
-    db="ds3002"
-)
\ No newline at end of file
+# Pool settings, overridable from the environment
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+POOL_RECYCLE = float(os.environ.get('DB_POOL_RECYCLE', 3600))
+POOL_PING_INTERVAL = float(os.environ.get('DB_POOL_PING_INTERVAL', 30))
+
+
+def connect():
+    return MySQLdb.connect(
+        host=HOST,
+        user=USER,
+        passwd=PASS,
+        db=DB_NAME
+    )
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+def _ping(conn):
+    # MySQLdb connections have ping(); anything else (e.g. sqlite3) gets a
+    # trivial query instead
+    if hasattr(conn, 'ping'):
+        conn.ping()
+    else:
+        conn.cursor().execute("SELECT 1")
+
+
+class ConnectionPool:
+    """A fixed-size pool of DB-API connections.
+
+    Connections are opened lazily by calling `connect()`, up to `size` of
+    them. A connection that has sat idle for `ping_interval` seconds is
+    pinged before it is handed out, one older than `recycle` seconds is
+    replaced, and one that fails its check (or cannot be rolled back when
+    it is returned) is closed and reopened on the next checkout.
+    """
+
+    def __init__(self, connect, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping_interval=POOL_PING_INTERVAL, ping=_ping):
+        self._connect = connect
+        self._ping = ping
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        # a LIFO stack, so the most recently used (warmest) connection goes
+        # out first
+        self._idle = []
+        self._lock = threading.Lock()
+        # notified whenever a connection is returned or a slot is freed
+        self._available = threading.Condition(self._lock)
+        self._opened = 0
+        self._info = {}
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'in_use': 0,
+            'in_use_max': 0,
+            'reconnects': 0,
+            'health_check_failures': 0,
+        }
+
+    def _open(self):
+        conn = self._connect()
+        now = time.monotonic()
+        with self._lock:
+            self._info[id(conn)] = {'created': now, 'used': now}
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._available:
+            self._info.pop(id(conn), None)
+            self._opened -= 1
+            # a waiter can open a new connection in this slot
+            self._available.notify()
+
+    def _usable(self, conn):
+        with self._lock:
+            info = dict(self._info[id(conn)])
+        now = time.monotonic()
+        if now - info['created'] > self.recycle:
+            return False
+        if now - info['used'] > self.ping_interval:
+            try:
+                self._ping(conn)
+            except Exception:
+                with self._lock:
+                    self._metrics['health_check_failures'] += 1
+                return False
+        return True
+
+    def acquire(self):
+        """Check out a connection, waiting up to `timeout` seconds for one."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            with self._available:
+                # an idle connection, else room to open one, else wait for
+                # release() or _discard() to provide either
+                while not self._idle and self._opened >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeout(f"no connection free after {self.timeout}s")
+                    waited = True
+                    self._available.wait(remaining)
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    conn = None
+                    self._opened += 1
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._available:
+                        self._opened -= 1
+                        self._available.notify()
+                    raise
+                break
+            if self._usable(conn):
+                break
+            self._discard(conn)
+            with self._lock:
+                self._metrics['reconnects'] += 1
+
+        wait = time.monotonic() - start
+        with self._lock:
+            m = self._metrics
+            m['checkouts'] += 1
+            m['in_use'] += 1
+            m['in_use_max'] = max(m['in_use_max'], m['in_use'])
+            if waited:
+                m['waits'] += 1
+            m['wait_time_total'] += wait
+            m['wait_time_max'] = max(m['wait_time_max'], wait)
+        return conn
+
+    def release(self, conn, broken=False):
+        """Return a connection; broken ones are closed instead of reused."""
+        with self._lock:
+            self._metrics['in_use'] -= 1
+        if not broken:
+            try:
+                # End any open transaction so the next user gets a fresh
+                # snapshot instead of whatever this request last read
+                conn.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            self._discard(conn)
+            return
+        with self._available:
+            self._info[id(conn)]['used'] = time.monotonic()
+            self._idle.append(conn)
+            self._available.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            # release() rolls back whatever the caller left open and drops
+            # the connection if even that fails
+            self.release(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['size'] = self.size
+            stats['open'] = self._opened
+            stats['idle'] = len(self._idle)
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+pool = ConnectionPool(connect)
+
+
+def get_db():
+    # FastAPI dependency: each request checks out its own connection
+    with pool.connection() as conn:
+        yield conn
@@ -1,24 +1,52 @@
 #!/usr/bin/env python3
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request, Path, Query
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import Optional
+import base64
 import os
 from database import *
+from cache import cache, loaders, read_through, metrics_text, CACHE_CURRENT_TTL, CACHE_STALE_TTL, CACHE_NEGATIVE_TTL
 import json
+import re
 import decimal
 from decimal import Decimal
 import datetime
 
 def Decoder(o):
-    if isinstance(o, datetime.datetime):
-        return str(o)
+    # same output as jsonable_encoder: ISO datetimes, Decimals as numbers
+    if isinstance(o, (datetime.datetime, datetime.date)):
+        return o.isoformat()
     elif isinstance(o, decimal.Decimal):
-        return o.__str__()
+        return int(o) if o.as_tuple().exponent >= 0 else float(o)
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+# built once and reused for every streamed batch
+encode = json.JSONEncoder(default=Decoder, separators=(',', ':')).encode
+
+# page sizes for GET /tracking/{year}/{month}
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+# rows fetched from the server-side cursor and encoded per streamed chunk
+STREAM_BATCH_SIZE = 500
+
+# rows per executemany() call in POST /tracking/batch
+INSERT_CHUNK_SIZE = int(os.environ.get('INSERT_CHUNK_SIZE', 1000))
+
+TRACK_COLUMNS = ('id', 'telem_1', 'telem_2', 'longitude', 'latitude', 'created_on')
+INSERT_TRACK = "INSERT INTO tracking (id,telem_1,telem_2,longitude,latitude,created_on) VALUES (%s,%s,%s,%s,%s,%s)"
 
 app = FastAPI()
 
+@app.exception_handler(PoolTimeout)
+def pool_timeout(request: Request, exc: PoolTimeout):
+    # every pooled connection is busy: ask the client to retry
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
 class Track(BaseModel):
     id: str
     telem_1: float
@@ -31,48 +59,282 @@ class Track(BaseModel):
 def read_root():
     return {"Hello": "Grabbing DB data!"}
 
+@app.get("/stats/pool")
+def pool_stats():
+    # connection pool wait-time and in-use metrics
+    return pool.stats()
+
+@app.get("/stats/cache")
+def cache_stats():
+    # month cache hits, misses and evictions, plus each read-through loader's counters
+    stats = cache.stats()
+    stats['loaders'] = {name: loader.stats() for name, loader in loaders.items()}
+    return stats
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # the same counters in the Prometheus text format
+    return metrics_text()
+
+def month_range(year, month):
+    # half-open [start, next month) range, so an index on created_on is usable
+    start = datetime.datetime(year, month, 1)
+    if month == 12:
+        return start, datetime.datetime(year + 1, 1, 1)
+    return start, datetime.datetime(year, month + 1, 1)
+
+def month_key(year, month):
+    # cache key for one month of tracking rows
+    return f"{year}-{month:02d}"
+
+def month_ttl(year, month):
+    # past months never change, so only the current (or a future) month expires
+    now = datetime.datetime.utcnow()
+    return CACHE_CURRENT_TTL if (year, month) >= (now.year, now.month) else None
+
+def created_month(created_on):
+    # month key of a created_on value such as '2020-08-23 10:26:20'
+    match = re.match(r'(\d{4})-(\d{1,2})', str(created_on))
+    return month_key(int(match.group(1)), int(match.group(2))) if match else None
+
+def invalidate_months(created_ons):
+    # drop the cached months that newly written rows fall into
+    for key in {created_month(c) for c in created_ons} - {None}:
+        month_page.invalidate(key)
+
+def encode_cursor(created_on, id):
+    # opaque keyset cursor: the (created_on, id) of the last row on a page
+    # created_on is a datetime from MySQLdb, or a string once it has been
+    # through jsonable_encoder / the Track model
+    if not isinstance(created_on, str):
+        created_on = created_on.isoformat()
+    raw = json.dumps([created_on, id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(after):
+    try:
+        created_on, id = json.loads(base64.urlsafe_b64decode(after.encode()))
+        return datetime.datetime.fromisoformat(created_on), id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid 'after' cursor")
+
+def stream_rows(query, params, fmt):
+    # Rows come off a server-side (unbuffered) cursor in batches and are
+    # encoded as they arrive, so memory and time to first byte stay flat
+    # however big the result is. The connection is held until the stream ends.
+    with pool.connection() as db:
+        c = db.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            c.execute(query, params)
+            headers = [x[0] for x in c.description]
+            yield ''   # open_stream() stops here
+            sep = ''
+            if fmt == 'json':
+                yield '['
+            while True:
+                rows = c.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                encoded = [encode(dict(zip(headers, row))) for row in rows]
+                if fmt == 'ndjson':
+                    yield '\n'.join(encoded) + '\n'
+                else:
+                    yield sep + ','.join(encoded)
+                    sep = ','
+            if fmt == 'json':
+                yield ']'
+        finally:
+            c.close()
+
+def open_stream(query, params, fmt):
+    # Run stream_rows() up to its first yield while still in the request, so
+    # a PoolTimeout or a failing query is answered with 503/500 before any
+    # 200 headers go out. Once started, the generator's finally releases the
+    # connection when the stream ends, or when it is closed or collected
+    # after the client goes away without reading it.
+    rows = stream_rows(query, params, fmt)
+    next(rows)
+    return rows
+
 @app.get("/tracking/{year}/{month}")
-def get_tracks(year: int, month: int):
-    # pay attention to dropped leading zeroes in months values
-    month2 = format(month, '02')
-    # perform a LIKE query
-    query = f"SELECT * FROM tracking WHERE created_on LIKE '{year}-{month2}-%';"
-    # set up cursor
-    c=db.cursor()
-    # execute query against cursor
-    c.execute(query)
-    # grab headers
-    headers=[x[0] for x in c.description]
-    # a fetchall to return results
-    results = c.fetchall()
+def get_tracks(
+    request: Request,
+    year: int,
+    month: int = Path(..., ge=1, le=12),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: Optional[str] = None,
+):
+    if after:
+        decode_cursor(after)  # a bad cursor is a 400 before anything is cached
+
+    # ?stream=json|ndjson streams every remaining row (or just `limit` of them)
+    if stream is not None:
+        if stream not in ('json', 'ndjson'):
+            raise HTTPException(status_code=400, detail="stream must be 'json' or 'ndjson'")
+        query, params = month_query(year, month, after)
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        media_type = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+        return StreamingResponse(open_stream(query, params, stream), media_type=media_type)
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    json_compatible_data, cursor = month_page(year, month, after, limit)
+    response = JSONResponse(content=json_compatible_data)
+    if cursor:
+        next_url = request.url.include_query_params(limit=limit, after=cursor)
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+def month_query(year, month, after=None):
+    start, end = month_range(year, month)
+    # parameterized range query, ordered by the (created_on, id) index
+    query = "SELECT * FROM tracking WHERE created_on >= %s AND created_on < %s"
+    params = [start, end]
+    if after:
+        # keyset pagination: continue right after the last row of the previous page
+        last_created, last_id = decode_cursor(after)
+        query += " AND (created_on > %s OR (created_on = %s AND id > %s))"
+        params += [last_created, last_created, last_id]
+    query += " ORDER BY created_on, id"
+    return query, params
+
+# Pages are cached per month (see cache.py). Concurrent requests for the same
+# uncached page share one query; the current month is served stale for up to
+# CACHE_STALE_TTL seconds while it is refreshed in the background, and an
+# empty page is only kept for CACHE_NEGATIVE_TTL seconds.
+@read_through(
+    key=lambda year, month, after, limit: (month_key(year, month), f"{after or ''}:{limit}"),
+    ttl=lambda year, month, after, limit: month_ttl(year, month),
+    stale=CACHE_STALE_TTL,
+    negative_ttl=CACHE_NEGATIVE_TTL,
+    is_negative=lambda page: not page[0],
+)
+def month_page(year, month, after, limit):
+    query, params = month_query(year, month, after)
+    return load_page(query, params, limit)
+
+def load_page(query, params, limit):
+    # one extra row tells us whether there is another page
+    query += " LIMIT %s"
+    params = params + [limit + 1]
+    with pool.connection() as db:
+        # set up cursor
+        c=db.cursor()
+        # execute query against cursor
+        c.execute(query, params)
+        # grab headers
+        headers=[x[0] for x in c.description]
+        results = c.fetchall()
+        c.close()
     # set up an empty container for results
     data=[]
     # iterate out results in a dict and append
-    for result in results:
+    for result in results[:limit]:
         data.append(dict(zip(headers,result)))
+    cursor = None
+    if len(results) > limit:
+        last = data[-1]
+        cursor = encode_cursor(last['created_on'], last['id'])
     # pass data through the json encoder above
-    json_compatible_data = jsonable_encoder(data)
-    return JSONResponse(content=json_compatible_data)
-    
+    return jsonable_encoder(data), cursor
+
 @app.post("/tracking/", status_code=201)
-async def add_track(item: Track):
+def add_track(item: Track, db=Depends(get_db)):
     # get out columnar values from submitted payload
     id = item.id
-    telem_1 = item.telem_1
-    telem_2 = item.telem_2
-    longitude = item.longitude
-    latitude = item.latitude
-    created_on = item.created_on
-    # pay attention to quote-wrapped values
-    query = f"INSERT INTO tracking (id,telem_1,telem_2,longitude,latitude,created_on) VALUES ('{id}','{telem_1}','{telem_2}','{longitude}','{latitude}','{created_on}');"
+    values = tuple(getattr(item, col) for col in TRACK_COLUMNS)
     try:
         c=db.cursor()
-        c.execute(query)
+        # parameterized, so values are quoted by the driver
+        c.execute(INSERT_TRACK, values)
         # This time commit instead of fetchall()
         results = db.commit()
+        invalidate_months([item.created_on])
         return {"created":"success","id":id}
-        db.close()
     except (MySQLdb.Error) as e:
         error_data = str(e)
         raise HTTPException(status_code=400, detail=error_data)
-        db.close()
+
+def parse_tracks(body, content_type):
+    # Accept a JSON array, or NDJSON (one object per line). Returns the
+    # validated rows as (index, values) and a list of per-row errors.
+    errors = []
+    if 'ndjson' in content_type or not body.lstrip().startswith(b'['):
+        items = []
+        for index, line in enumerate(body.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                items.append((index, json.loads(line)))
+            except ValueError as e:
+                errors.append({"index": index, "error": f"invalid JSON: {e}"})
+    else:
+        try:
+            items = list(enumerate(json.loads(body)))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"invalid JSON: {e}")
+
+    rows = []
+    for index, obj in items:
+        try:
+            item = Track(**obj)
+        except (ValidationError, TypeError) as e:
+            errors.append({"index": index, "error": str(e)})
+            continue
+        rows.append((index, tuple(getattr(item, col) for col in TRACK_COLUMNS)))
+    return rows, errors
+
+def insert_tracks(rows):
+    # Insert in chunks of INSERT_CHUNK_SIZE with executemany() (MySQLdb turns
+    # that into one multi-row INSERT per chunk) and commit once at the end.
+    # A failing chunk is retried row by row so only the bad rows are reported.
+    errors = []
+    inserted = 0
+    with pool.connection() as db:
+        c = db.cursor()
+        for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+            chunk = rows[i:i + INSERT_CHUNK_SIZE]
+            # the savepoint undoes a half-applied chunk before the retry
+            c.execute("SAVEPOINT chunk")
+            try:
+                c.executemany(INSERT_TRACK, [values for index, values in chunk])
+                inserted += len(chunk)
+                continue
+            except MySQLdb.Error:
+                c.execute("ROLLBACK TO SAVEPOINT chunk")
+            for index, values in chunk:
+                try:
+                    c.execute(INSERT_TRACK, values)
+                    inserted += 1
+                except MySQLdb.Error as e:
+                    errors.append({"index": index, "id": values[0], "error": str(e)})
+        db.commit()
+        c.close()
+    return inserted, errors
+
+def ingest_tracks(body, content_type):
+    # parse, validate and insert a batch; all blocking, so add_tracks runs it
+    # in the threadpool rather than on the event loop
+    rows, errors = parse_tracks(body, content_type)
+    inserted, insert_errors = insert_tracks(rows) if rows else (0, [])
+    invalidate_months(values[-1] for index, values in rows)
+    return inserted, errors, insert_errors
+
+@app.post("/tracking/batch")
+async def add_tracks(request: Request):
+    body = await request.body()
+    inserted, errors, insert_errors = await run_in_threadpool(
+        ingest_tracks, body, request.headers.get('content-type', ''))
+    errors = sorted(errors + insert_errors, key=lambda e: e['index'])
+    # 201 when every row went in, 207 when only some did, 400 when none did
+    if not errors:
+        status_code = 201
+    elif inserted:
+        status_code = 207
+    else:
+        status_code = 400
+    content = {"received": inserted + len(errors), "inserted": inserted, "errors": errors}
+    return JSONResponse(status_code=status_code, content=content)
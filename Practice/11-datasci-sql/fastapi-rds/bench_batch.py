@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# Compare rows/sec for POST /tracking/ (one row per request) against
+# POST /tracking/batch on a running instance of the API.
+#
+#   python3 bench_batch.py --url http://localhost:8080 --rows 20000 --batch 1000
+#
+# Rows get random UUID ids and are written to the real table, so point this
+# at a test database.
+
+import argparse
+import datetime
+import json
+import random
+import time
+import uuid
+import requests
+
+
+def make_rows(n, month):
+    start = datetime.datetime(2020, month, 1)
+    for _ in range(n):
+        created = start + datetime.timedelta(seconds=random.randrange(28 * 24 * 3600))
+        yield {
+            "id": str(uuid.uuid4()),
+            "telem_1": round(random.random(), 4),
+            "telem_2": round(random.random(), 4),
+            "longitude": round(random.uniform(-180, 180), 6),
+            "latitude": round(random.uniform(-90, 90), 6),
+            "created_on": created.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+
+def bench_single(session, url, rows):
+    start = time.perf_counter()
+    for row in rows:
+        session.post(f"{url}/tracking/", json=row).raise_for_status()
+    return time.perf_counter() - start
+
+
+def bench_batch(session, url, rows, batch, ndjson):
+    inserted = 0
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        chunk = rows[i:i + batch]
+        if ndjson:
+            body = '\n'.join(json.dumps(r) for r in chunk)
+            r = session.post(f"{url}/tracking/batch", data=body,
+                             headers={'Content-Type': 'application/x-ndjson'})
+        else:
+            r = session.post(f"{url}/tracking/batch", json=chunk)
+        inserted += r.json()['inserted']
+    return time.perf_counter() - start, inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-row vs batch tracking inserts.')
+    parser.add_argument('--url', default='http://localhost:8080')
+    parser.add_argument('--rows', type=int, default=20000, help='rows for the batch endpoint')
+    parser.add_argument('--single-rows', type=int, default=1000, help='rows for the single-row endpoint')
+    parser.add_argument('--batch', type=int, default=1000, help='rows per batch request')
+    parser.add_argument('--ndjson', action='store_true', help='send batches as NDJSON')
+    parser.add_argument('--month', type=int, default=11)
+    args = parser.parse_args()
+
+    session = requests.Session()
+
+    single = list(make_rows(args.single_rows, args.month))
+    elapsed = bench_single(session, args.url, single)
+    single_rate = len(single) / elapsed
+    print(f"POST /tracking/       {len(single):>8} rows {elapsed:8.2f}s {single_rate:10.0f} rows/s")
+
+    rows = list(make_rows(args.rows, args.month))
+    elapsed, inserted = bench_batch(session, args.url, rows, args.batch, args.ndjson)
+    batch_rate = inserted / elapsed
+    print(f"POST /tracking/batch  {inserted:>8} rows {elapsed:8.2f}s {batch_rate:10.0f} rows/s"
+          f"  ({batch_rate / single_rate:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+-- GET /tracking/{year}/{month} filters on a half-open created_on range and
+-- pages through it ordered by (created_on, id). This index serves both the
+-- range scan and the keyset order, so neither needs a full table scan or a sort.
+--
+-- Run once against the database:
+--   mysql -h <host> -u ds3002 -p ds3002 < migrations/001_tracking_created_on_index.sql
+
+ALTER TABLE tracking ADD INDEX idx_tracking_created_on_id (created_on, id);
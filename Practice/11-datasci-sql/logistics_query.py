@@ -2,8 +2,10 @@
 
 import json
 import os
+import sys
 import MySQLdb
 import MySQLdb._exceptions
+import MySQLdb.cursors
 import decimal
 from decimal import Decimal
 import datetime
@@ -13,6 +15,13 @@ def Decoder(o):
         return str(o)
     if isinstance(o, decimal.Decimal):
         return o.__str__()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+# Build the encoder once instead of on every json.dumps() call
+encode = json.JSONEncoder(default=Decoder).encode
+
+# Rows pulled from the server-side cursor per batch
+BATCH_SIZE = 1000
 
 year = '2020'
 month = '08'
@@ -24,37 +33,38 @@ DB = "nem2p"
 
 db=MySQLdb.connect(host=DBHOST,user=DBUSER,passwd=DBPASS,db=DB)
 
-def get_logistics(year: int, month: int):
-    query = f"SELECT * FROM logistics WHERE created_on LIKE '{year}-{month}-%' ORDER BY created_on;"
-    c=db.cursor()
+def get_logistics(year: int, month: int, out=sys.stdout):
+    # Half-open date range for the month, passed as query parameters
+    start = datetime.datetime(int(year), int(month), 1)
+    end = datetime.datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    query = "SELECT * FROM logistics WHERE created_on >= %s AND created_on < %s ORDER BY created_on;"
+    # SSCursor streams rows from the server instead of loading them all at once
+    c=db.cursor(MySQLdb.cursors.SSCursor)
     try:
-        c.execute(query)
+        c.execute(query, (start, end))
         headers=[x[0] for x in c.description]
-        results = c.fetchall()
-        json_data=[]
-        for result in results:
-            json_data.append(dict(zip(headers,result)))
-        output = json.dumps(json_data, default = Decoder)
-        print(output)
-        return(output)
+        # Write the JSON array out batch by batch as rows arrive
+        count = 0
+        out.write('[')
+        while True:
+            results = c.fetchmany(BATCH_SIZE)
+            if not results:
+                break
+            if count:
+                out.write(', ')
+            out.write(', '.join(encode(dict(zip(headers,result))) for result in results))
+            count += len(results)
+        out.write(']\n')
+        out.flush()
+        return count
     except MySQLdb.Error as e:
-        print("MySQL Error: ", str(e))
+        print("MySQL Error: ", str(e), file=sys.stderr)
         return None
     finally:
         c.close()
         db.close()
 
 
-
-
-
-
-
-    c.close()
-    db.close()
-    return output
-
-
 # Run the script
 if __name__ == '__main__':
     get_logistics(year,month)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Measure cold-start time and per-operation latency through the shared
+# Mongo access layer (database.py -> mongo-api/chalicelib/mongo.py).
+#
+#   MONGO_URI=mongodb://localhost:27017 MONGO_USER= python3 bench_mongo.py
+#   python3 bench_mongo.py --mock          # in-memory mongomock, no server
+#   python3 bench_mongo.py --async         # also time the Motor (asyncio) client
+#
+# Writes go to a scratch collection (bench.ops) that is dropped at the end.
+
+import argparse
+import asyncio
+import statistics
+import time
+import database
+
+
+def summarize(name, samples):
+    ms = sorted(s * 1000 for s in samples)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(f"{name:<22} n={len(ms):<6} p50={statistics.median(ms):8.3f} ms  "
+          f"p99={p99:8.3f} ms  {len(ms) / (sum(ms) / 1000):10.0f} ops/s")
+
+
+def timed(fn, n):
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_sync(n):
+    # cold start: create the client and complete the first round trip
+    start = time.perf_counter()
+    coll = database.get_db('bench').ops
+    coll.find_one()
+    print(f"{'cold start':<22} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+    # the second lookup must reuse the same client and pool
+    start = time.perf_counter()
+    database.get_db('bench').ops.find_one()
+    print(f"{'warm first op':<22} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+    summarize('insert_one', timed(lambda i: coll.insert_one({'i': i, 'name': f'doc {i}'}), n))
+    summarize('find_one', timed(lambda i: coll.find_one({'i': i}), n))
+    summarize('update_one', timed(lambda i: coll.update_one({'i': i}, {'$set': {'seen': True}}), n))
+    summarize('count_documents', timed(lambda i: coll.count_documents({'seen': True}), max(n // 10, 1)))
+    coll.drop()
+
+
+async def bench_async(n):
+    start = time.perf_counter()
+    coll = database.get_async_db('bench').ops
+    await coll.find_one()
+    print(f"{'async cold start':<22} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+    async def one(i):
+        t = time.perf_counter()
+        await coll.insert_one({'i': i})
+        return time.perf_counter() - t
+
+    # fire all inserts at once; the pool bounds the real concurrency
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    summarize('async insert_one', samples)
+    print(f"{'async wall clock':<22} {elapsed * 1000:8.3f} ms  {n / elapsed:10.0f} ops/s")
+    await coll.drop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shared Mongo access layer.')
+    parser.add_argument('-n', type=int, default=1000, help='operations per test')
+    parser.add_argument('--mock', action='store_true', help='use mongomock instead of a server')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='also time the Motor client')
+    args = parser.parse_args()
+
+    if args.mock:
+        import mongomock
+        database.set_client(mongomock.MongoClient())
+    bench_sync(args.n)
+    if args.use_async:
+        if args.mock:
+            print("mongomock has no asyncio client; skipping --async")
+        else:
+            asyncio.run(bench_async(args.n))
+    database.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,25 @@
-from pymongo import MongoClient, errors
-from bson.json_util import dumps
-import prettyprint as pprint
 import os
+import sys
 
-# mongopass = os.getenv('MONGOPASS')
-# uri = "mongodb+srv://cluster0.pguxs.mongodb.net/sample_restaurants"
-# client = MongoClient(uri, username='mongo', password=mongopass, connectTimeoutMS=200, retryWrites=True)
-# sampler = client.sample_restaurants
-# restaurants = sampler.restaurants
+# The shared access module lives in the Chalice app's chalicelib/ so that it
+# is deployed with the API; the scripts in this directory load it from there.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mongo-api'))
+from chalicelib.mongo import get_client, get_db, get_async_client, get_async_db, set_client, close
 
-mongopass = os.getenv('MONGOPASS')
-uri = "mongodb+srv://cluster0.pnxzwgz.mongodb.net/sample_restaurants"
-client = MongoClient(uri, username='nmagee', password=mongopass, connectTimeoutMS=200, retryWrites=True)
-sampler = client.sample_restaurants
-restaurants = sampler.restaurants
\ No newline at end of file
+# Connection settings (MONGO_URI, MONGO_USER, MONGOPASS, pool size and timeouts)
+# are read from the environment; see mongo-api/chalicelib/mongo.py.
+
+# client / sampler / restaurants are left out on purpose: `import *` would
+# look them up, and so connect, at import time. Import them by name.
+__all__ = ['get_client', 'get_db', 'get_async_client', 'get_async_db', 'set_client', 'close']
+
+
+def __getattr__(name):
+    # client / sampler / restaurants are looked up when first used, not at import
+    if name == 'client':
+        return get_client()
+    if name == 'sampler':
+        return get_db('sample_restaurants')
+    if name == 'restaurants':
+        return get_db('sample_restaurants').restaurants
+    raise AttributeError(f"module 'database' has no attribute '{name}'")
@@ -1,16 +1,25 @@
-from chalice import Chalice, Response
+from chalice import Chalice, Response, BadRequestError
 import os
 import logging
 import bson
 import json
-from pymongo import MongoClient
+from chalicelib.mongo import get_db
+from chalicelib.bulk import bulk_write
 
-# Set up normal Mongo Atlas connection + db + collection
-mongopass = os.getenv('MONGOPASS')
-uri = "mongodb+srv://cluster0.pguxs.mongodb.net/things"
-client = MongoClient(uri, username='mongo', password=mongopass, connectTimeoutMS=200, retryWrites=True)
-db = client.things
-hobbies = db.hobbies
+# The Mongo client is shared and pooled (see chalicelib/mongo.py). It is
+# created on the first request, and warm Lambda invocations reuse it.
+DB_NAME = 'things'
+
+# Page size for GET /hobbies, and documents per round trip from the server
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+BATCH_SIZE = 500
+
+# Only the fields the API returns are sent back by the server
+HOBBY_FIELDS = {'_id': 1, 'name': 1, 'requires': 1}
+
+# Most items accepted by one POST /hobbies/bulk request
+MAX_BULK_ITEMS = 10000
 
 # Instantiate the Chalice app
 app = Chalice(app_name='mongo-api')
@@ -18,19 +27,47 @@ app = Chalice(app_name='mongo-api')
 # A simple base route
 @app.route('/') # zone apex
 def index():
-    return {'hello': 'world', "methods": ["GET","POST"], "endpoints": ["/hobbies"]}
+    return {'hello': 'world', "methods": ["GET","POST"], "endpoints": ["/hobbies", "/hobbies/bulk"]}
 
-# get all hobbies
+# get hobbies, one page at a time
+# ?limit=N (default 100, max 1000), ?after=<id from X-Next-After>, ?format=ndjson
 @app.route('/hobbies', methods=['GET'])
 def get_hobbies():
-    hobbies = db.hobbies.find({})
+    params = app.current_request.query_params or {}
+    try:
+        limit = min(max(int(params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise BadRequestError("limit must be an integer")
+    query = {}
+    if params.get('after'):
+        try:
+            query['_id'] = {'$gt': bson.ObjectId(params['after'])}
+        except bson.errors.InvalidId:
+            raise BadRequestError("after must be an ObjectId")
+
+    # keyset pagination on _id; one extra document tells us if there is more
+    hobbies = get_db(DB_NAME).hobbies.find(query, projection=HOBBY_FIELDS) \
+        .sort('_id', 1).limit(limit + 1).batch_size(min(limit + 1, BATCH_SIZE))
     results = []
+    last_id = None
     for hobby in hobbies:
-        output = {}
-        output['name'] = hobby['name']
-        output['requires']= hobby['requires']
-        results.append(output)
-    return results
+        if len(results) == limit:
+            break
+        last_id = hobby['_id']
+        results.append({'name': hobby.get('name'), 'requires': hobby.get('requires')})
+    else:
+        # the cursor ran out before the extra document: this is the last page
+        last_id = None
+
+    headers = {}
+    if last_id is not None:
+        headers['X-Next-After'] = str(last_id)
+    if params.get('format') == 'ndjson':
+        # API Gateway buffers the response, so this is one body of lines
+        headers['Content-Type'] = 'application/x-ndjson'
+        body = ''.join(json.dumps(r) + '\n' for r in results)
+        return Response(body=body, headers=headers, status_code=200)
+    return Response(body=results, headers=headers, status_code=200)
 
 # post a new hobby
 @app.route('/hobbies', methods=['POST'])
@@ -39,5 +76,32 @@ def post_hobbies():
     addthis = {}
     addthis['name'] = payload['name']
     addthis['requires'] = payload['requires']
-    hobbies = db.hobbies.insert_one(addthis)
-    return {"inserted": 200}
\ No newline at end of file
+    hobbies = get_db(DB_NAME).hobbies.insert_one(addthis)
+    return {"inserted": 200}
+
+# post many hobbies (and updates/deletes) in one request
+# body: a JSON array, or NDJSON with Content-Type: application/x-ndjson
+# see chalicelib/bulk.py for the item format
+@app.route('/hobbies/bulk', methods=['POST'],
+           content_types=['application/json', 'application/x-ndjson'])
+def post_hobbies_bulk():
+    request = app.current_request
+    try:
+        if request.headers.get('content-type', '').startswith('application/x-ndjson'):
+            lines = request.raw_body.decode('utf-8').splitlines()
+            items = [json.loads(line) for line in lines if line.strip()]
+        else:
+            items = request.json_body
+    except ValueError:
+        raise BadRequestError("body must be a JSON array or NDJSON")
+    if not isinstance(items, list) or not items:
+        raise BadRequestError("body must be a non-empty JSON array or NDJSON")
+    if len(items) > MAX_BULK_ITEMS:
+        raise BadRequestError(f"at most {MAX_BULK_ITEMS} items per request")
+
+    # plain hobbies keep the same fields as POST /hobbies
+    items = [{'name': i.get('name'), 'requires': i.get('requires')}
+             if isinstance(i, dict) and 'op' not in i else i for i in items]
+    summary = bulk_write(get_db(DB_NAME).hobbies, items)
+    status = 207 if summary['errors'] else 200
+    return Response(body=summary, status_code=status)
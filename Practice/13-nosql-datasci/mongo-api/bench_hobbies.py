@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Benchmark GET /hobbies against a seeded local collection: the old
+# "find everything and copy it" handler versus walking the paged,
+# projected endpoint.
+#
+#   MONGO_URI=mongodb://localhost:27017 MONGO_USER= python3 bench_hobbies.py -n 100000
+#   python3 bench_hobbies.py --mock -n 20000
+#
+# The hobbies collection of the bench_things database is dropped and reseeded.
+
+import argparse
+import json
+import time
+import app
+from chalice.test import Client
+from chalicelib import mongo
+
+
+def seed(coll, n):
+    coll.drop()
+    # a padding field stands in for the data the API never returns
+    docs = ({'name': f'hobby {i}', 'requires': ['time', 'patience'], 'notes': 'x' * 512}
+            for i in range(n))
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == 1000:
+            coll.insert_many(batch)
+            batch = []
+    if batch:
+        coll.insert_many(batch)
+
+
+def old_handler(coll):
+    # what GET /hobbies used to do: no projection, no limit
+    results = []
+    for hobby in coll.find({}):
+        results.append({'name': hobby['name'], 'requires': hobby['requires']})
+    return json.dumps(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GET /hobbies.')
+    parser.add_argument('-n', type=int, default=20000, help='documents to seed')
+    parser.add_argument('--limit', type=int, default=app.DEFAULT_LIMIT, help='page size')
+    parser.add_argument('--mock', action='store_true', help='use mongomock instead of a server')
+    args = parser.parse_args()
+
+    if args.mock:
+        import mongomock
+        mongo.set_client(mongomock.MongoClient())
+    app.DB_NAME = 'bench_things'
+    coll = mongo.get_db(app.DB_NAME).hobbies
+    seed(coll, args.n)
+
+    start = time.perf_counter()
+    body = old_handler(coll)
+    old = time.perf_counter() - start
+    print(f"old handler, one response   {old * 1000:10.1f} ms  {len(body) / 1024:10.1f} KB")
+
+    with Client(app.app) as client:
+        start = time.perf_counter()
+        first = client.http.get(f'/hobbies?limit={args.limit}')
+        page = time.perf_counter() - start
+        print(f"first page of {args.limit:<5}          {page * 1000:10.1f} ms  {len(first.body) / 1024:10.1f} KB")
+
+        start = time.perf_counter()
+        pages, docs, after = 0, 0, ''
+        while True:
+            r = client.http.get(f'/hobbies?limit={args.limit}' + (f'&after={after}' if after else ''))
+            pages += 1
+            docs += len(r.json_body)
+            after = r.headers.get('X-Next-After')
+            if not after:
+                break
+        walk = time.perf_counter() - start
+        print(f"all {pages} pages ({docs} docs)   {walk * 1000:10.1f} ms")
+
+    coll.drop()
+
+
+if __name__ == '__main__':
+    main()
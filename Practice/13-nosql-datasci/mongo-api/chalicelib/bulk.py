@@ -0,0 +1,131 @@
+import time
+from itertools import islice
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+
+# Bulk writes shared by POST /hobbies/bulk and ../mongo_bulk.py.
+#
+# Each item describes one write:
+#
+#   {"name": "chess", ...}                              insert this document
+#   {"op": "insert", "document": {...}}                 the same, spelled out
+#   {"op": "update", "filter": {...}, "set": {...},     $set and/or $push on the
+#    "push": {...}, "upsert": true}                     first match (upsert by default)
+#   {"op": "delete", "filter": {...}}                   delete the first match
+#
+# Items are sent to the server in chunks with ordered=False, so one bad
+# document does not stop the rest of its chunk.
+
+BULK_CHUNK_SIZE = 1000
+
+
+def to_request(item):
+    """Turn one item into a pymongo write request, or raise ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("each item must be a JSON object")
+    op = item.get('op')
+    if op is None:
+        return InsertOne(item)
+    if op == 'insert':
+        if not isinstance(item.get('document'), dict):
+            raise ValueError("insert needs a 'document' object")
+        return InsertOne(item['document'])
+    if op not in ('update', 'delete'):
+        raise ValueError(f"unknown op {op!r}")
+    if not isinstance(item.get('filter'), dict) or not item['filter']:
+        raise ValueError(f"{op} needs a non-empty 'filter' object")
+    if op == 'update':
+        update = {}
+        if item.get('set'):
+            update['$set'] = item['set']
+        if item.get('push'):
+            update['$push'] = item['push']
+        if not update:
+            raise ValueError("update needs 'set' and/or 'push'")
+        return UpdateOne(item['filter'], update, upsert=item.get('upsert', True))
+    return DeleteOne(item['filter'])
+
+
+def inserted_document(item):
+    op = item.get('op')
+    if op is None:
+        return item
+    if op == 'insert':
+        return item['document']
+    return None
+
+
+def chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_chunk(collection, chunk, offset, summary, results):
+    requests = []
+    positions = []
+    for i, item in enumerate(chunk):
+        try:
+            requests.append(to_request(item))
+            positions.append(offset + i)
+        except ValueError as e:
+            summary['errors'] += 1
+            if results is not None:
+                results[offset + i] = {'index': offset + i, 'status': 'error', 'error': str(e)}
+    if not requests:
+        return
+
+    try:
+        details = collection.bulk_write(requests, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+
+    summary['inserted'] += details.get('nInserted', 0)
+    summary['matched'] += details.get('nMatched', 0)
+    summary['modified'] += details.get('nModified', 0)
+    summary['upserted'] += details.get('nUpserted', 0)
+    summary['deleted'] += details.get('nRemoved', 0)
+    summary['errors'] += len(details.get('writeErrors', []))
+    if results is None:
+        return
+
+    # indexes in the server's reply are positions in `requests`
+    for position in positions:
+        result = {'index': position, 'status': 'ok'}
+        document = inserted_document(chunk[position - offset])
+        if document is not None:
+            # pymongo fills in _id on the document it inserts
+            result['id'] = str(document['_id'])
+        results[position] = result
+    for upsert in details.get('upserted', []):
+        results[positions[upsert['index']]]['id'] = str(upsert['_id'])
+    for error in details.get('writeErrors', []):
+        result = results[positions[error['index']]]
+        result.pop('id', None)
+        result['status'] = 'error'
+        result['error'] = error.get('errmsg')
+        result['code'] = error.get('code')
+
+
+def bulk_write(collection, items, chunk_size=BULK_CHUNK_SIZE, results=True):
+    """Write `items` to `collection` in unordered bulk_write chunks.
+
+    Returns counts, elapsed seconds, docs/sec and (unless results=False)
+    one result per item, in input order.
+    """
+    summary = {'items': 0, 'inserted': 0, 'matched': 0, 'modified': 0,
+               'upserted': 0, 'deleted': 0, 'errors': 0}
+    per_item = {} if results else None
+    start = time.perf_counter()
+    for chunk in chunks(items, chunk_size):
+        write_chunk(collection, chunk, summary['items'], summary, per_item)
+        summary['items'] += len(chunk)
+    elapsed = time.perf_counter() - start
+    summary['seconds'] = round(elapsed, 3)
+    summary['docs_per_sec'] = round(summary['items'] / elapsed) if elapsed else None
+    if results:
+        summary['results'] = [per_item[i] for i in range(summary['items'])]
+    return summary
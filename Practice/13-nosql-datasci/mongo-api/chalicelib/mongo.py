@@ -0,0 +1,97 @@
+import os
+import threading
+from pymongo import MongoClient
+
+# Shared MongoDB access for the Chalice app and the scripts one directory up.
+#
+# One client per process, created the first time it is needed (not at import
+# time), so a Lambda cold start or a script that never touches the database
+# does not pay for it. The client keeps its own connection pool; every
+# caller shares it. Settings come from the environment:
+#
+#   MONGO_URI                          default: the class Atlas cluster
+#   MONGO_USER / MONGOPASS             credentials (MONGO_USER='' for none)
+#   MONGO_MAX_POOL_SIZE                default: 10
+#   MONGO_MIN_POOL_SIZE                default: 0
+#   MONGO_CONNECT_TIMEOUT_MS           default: 200
+#   MONGO_SERVER_SELECTION_TIMEOUT_MS  default: 5000
+#   MONGO_SOCKET_TIMEOUT_MS            default: none
+
+MONGO_URI = os.getenv('MONGO_URI', "mongodb+srv://cluster0.pguxs.mongodb.net/")
+MONGO_USER = os.getenv('MONGO_USER', 'mongo')
+MONGOPASS = os.getenv('MONGOPASS')
+MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 10))
+MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 200))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+SOCKET_TIMEOUT_MS = os.getenv('MONGO_SOCKET_TIMEOUT_MS')
+
+_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def client_options():
+    options = {
+        'maxPoolSize': MAX_POOL_SIZE,
+        'minPoolSize': MIN_POOL_SIZE,
+        'connectTimeoutMS': CONNECT_TIMEOUT_MS,
+        'serverSelectionTimeoutMS': SERVER_SELECTION_TIMEOUT_MS,
+        'retryWrites': True,
+    }
+    if SOCKET_TIMEOUT_MS:
+        options['socketTimeoutMS'] = int(SOCKET_TIMEOUT_MS)
+    if MONGO_USER:
+        options['username'] = MONGO_USER
+        options['password'] = MONGOPASS
+    return options
+
+
+def get_client():
+    """The shared, pooled MongoClient (created on first use)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI, **client_options())
+    return _client
+
+
+def get_db(name):
+    return get_client()[name]
+
+
+def get_async_client():
+    """The shared Motor (asyncio) client, for code running in an event loop."""
+    global _async_client
+    if _async_client is None:
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+        except ImportError:
+            raise RuntimeError("the asyncio interface needs the 'motor' package: pip install motor")
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncIOMotorClient(MONGO_URI, **client_options())
+    return _async_client
+
+
+def get_async_db(name):
+    return get_async_client()[name]
+
+
+def set_client(client=None, async_client=None):
+    """Use the given clients instead (e.g. mongomock for local testing)."""
+    global _client, _async_client
+    with _lock:
+        _client = client
+        _async_client = async_client
+
+
+def close():
+    global _client, _async_client
+    with _lock:
+        if _client is not None:
+            _client.close()
+        if _async_client is not None:
+            _async_client.close()
+        _client = _async_client = None
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+# Restaurant analytics with aggregation pipelines: the grouping, counting,
+# sorting and averaging all run inside MongoDB, and only the (small) result
+# comes back. Results are columnar - a dict of equal-length lists - so they
+# drop straight into pandas:
+#
+#   import pandas as pd
+#   from mongo_analytics import counts_by
+#   df = pd.DataFrame(counts_by('borough', 'cuisine'))
+#
+# From the command line, each report is printed as one line of JSON:
+#
+#   python3 mongo_analytics.py counts borough
+#   python3 mongo_analytics.py counts borough cuisine
+#   python3 mongo_analytics.py top-cuisines --borough Brooklyn -n 5
+#   python3 mongo_analytics.py grades borough
+#   python3 mongo_analytics.py best -n 10 --min-grades 4
+#   python3 mongo_analytics.py near -73.976112 40.786714 --meters 500
+
+import argparse
+import json
+import sys
+from pymongo import GEOSPHERE
+from pymongo.errors import OperationFailure
+import database
+
+
+def columnar(docs, fields):
+    # one list per field instead of one dict per document
+    columns = {field: [] for field in fields}
+    for doc in docs:
+        for field in fields:
+            columns[field].append(doc.get(field))
+    return columns
+
+
+def aggregate(pipeline, fields):
+    cursor = database.restaurants.aggregate(pipeline, allowDiskUse=True, batchSize=1000)
+    return columnar(cursor, fields)
+
+
+def group_fields(fields):
+    # {'borough': '$borough', ...} for $group, and the $project that lifts
+    # the group key back out of _id
+    key = {field: '$' + field for field in fields}
+    lift = {field: '$_id.' + field for field in fields}
+    return key, lift
+
+
+def counts_by(*fields):
+    """Number of restaurants for each combination of `fields`, largest first."""
+    key, lift = group_fields(fields)
+    pipeline = [
+        {'$group': {'_id': key, 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$project': dict(lift, _id=0, count=1)},
+    ]
+    return aggregate(pipeline, list(fields) + ['count'])
+
+
+def top_cuisines(n=10, borough=None):
+    """The n most common cuisines, optionally in one borough."""
+    pipeline = [{'$match': {'borough': borough}}] if borough else []
+    pipeline += [
+        {'$group': {'_id': '$cuisine', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': n},
+        {'$project': {'_id': 0, 'cuisine': '$_id', 'count': 1}},
+    ]
+    return aggregate(pipeline, ['cuisine', 'count'])
+
+
+def grade_stats(*fields):
+    """Inspection score statistics (lower is better) per combination of `fields`."""
+    key, lift = group_fields(fields)
+    pipeline = [
+        {'$unwind': '$grades'},
+        {'$group': {
+            '_id': key,
+            'inspections': {'$sum': 1},
+            'avg_score': {'$avg': '$grades.score'},
+            'min_score': {'$min': '$grades.score'},
+            'max_score': {'$max': '$grades.score'},
+            'grade_a': {'$sum': {'$cond': [{'$eq': ['$grades.grade', 'A']}, 1, 0]}},
+        }},
+        {'$sort': {'avg_score': 1}},
+        {'$project': dict(lift, _id=0, inspections=1, min_score=1, max_score=1, grade_a=1,
+                          avg_score={'$round': ['$avg_score', 2]})},
+    ]
+    return aggregate(pipeline, list(fields) + ['inspections', 'avg_score', 'min_score', 'max_score', 'grade_a'])
+
+
+def best_restaurants(n=10, min_grades=3, borough=None, cuisine=None):
+    """The n restaurants with the lowest average score over at least `min_grades` inspections."""
+    match = {'grades.{}'.format(max(min_grades, 1) - 1): {'$exists': True}}
+    if borough:
+        match['borough'] = borough
+    if cuisine:
+        match['cuisine'] = cuisine
+    pipeline = [
+        {'$match': match},
+        {'$project': {'_id': 0, 'name': 1, 'borough': 1, 'cuisine': 1,
+                      'inspections': {'$size': '$grades'},
+                      'avg_score': {'$round': [{'$avg': '$grades.score'}, 2]}}},
+        {'$sort': {'avg_score': 1, 'inspections': -1}},
+        {'$limit': n},
+    ]
+    return aggregate(pipeline, ['name', 'borough', 'cuisine', 'inspections', 'avg_score'])
+
+
+def ensure_geo_index():
+    # $geoNear needs a 2dsphere index; address.coord holds [longitude, latitude]
+    try:
+        database.restaurants.create_index([('address.coord', GEOSPHERE)])
+    except OperationFailure as e:
+        raise RuntimeError(f"could not index address.coord ({e}); "
+                           "remove documents with malformed coordinates and try again") from e
+
+
+def near(longitude, latitude, meters=1000, n=20, cuisine=None):
+    """Restaurants within `meters` of a point, nearest first."""
+    ensure_geo_index()
+    geo = {
+        'near': {'type': 'Point', 'coordinates': [longitude, latitude]},
+        'distanceField': 'meters',
+        'maxDistance': meters,
+        'spherical': True,
+        'key': 'address.coord',
+    }
+    if cuisine:
+        geo['query'] = {'cuisine': cuisine}
+    pipeline = [
+        {'$geoNear': geo},
+        {'$limit': n},
+        {'$project': {'_id': 0, 'name': 1, 'cuisine': 1, 'borough': 1, 'meters': {'$round': ['$meters', 1]}}},
+    ]
+    return aggregate(pipeline, ['name', 'cuisine', 'borough', 'meters'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregation-pipeline reports on sample_restaurants.')
+    sub = parser.add_subparsers(dest='report', required=True)
+
+    p = sub.add_parser('counts', help='restaurants per borough, cuisine, ...')
+    p.add_argument('fields', nargs='+')
+    p = sub.add_parser('top-cuisines', help='most common cuisines')
+    p.add_argument('-n', type=int, default=10)
+    p.add_argument('--borough')
+    p = sub.add_parser('grades', help='inspection score statistics')
+    p.add_argument('fields', nargs='+')
+    p = sub.add_parser('best', help='lowest average inspection scores')
+    p.add_argument('-n', type=int, default=10)
+    p.add_argument('--min-grades', type=int, default=3)
+    p.add_argument('--borough')
+    p.add_argument('--cuisine')
+    p = sub.add_parser('near', help='restaurants near a point')
+    p.add_argument('longitude', type=float)
+    p.add_argument('latitude', type=float)
+    p.add_argument('--meters', type=float, default=1000)
+    p.add_argument('-n', type=int, default=20)
+    p.add_argument('--cuisine')
+    args = parser.parse_args()
+
+    if args.report == 'counts':
+        result = counts_by(*args.fields)
+    elif args.report == 'top-cuisines':
+        result = top_cuisines(args.n, args.borough)
+    elif args.report == 'grades':
+        result = grade_stats(*args.fields)
+    elif args.report == 'best':
+        result = best_restaurants(args.n, args.min_grades, args.borough, args.cuisine)
+    else:
+        try:
+            result = near(args.longitude, args.latitude, args.meters, args.n, args.cuisine)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    print(json.dumps(result, separators=(',', ':')))
+    database.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+# Load a JSON array or NDJSON file into a collection with unordered
+# bulk_write batches (inserts, $set/$push upserts and deletes; see
+# mongo-api/chalicelib/bulk.py for the item format).
+#
+#   python3 mongo_bulk.py restaurants.json                 # mongoexport output
+#   python3 mongo_bulk.py --db things --collection hobbies hobbies.ndjson
+#   python3 mongo_bulk.py --mock --compare restaurants.json
+#
+# Extended JSON ({"$oid": ...}, {"$date": ...}) is read as BSON types.
+
+import argparse
+import itertools
+import json
+import sys
+import time
+from bson.json_util import loads, dumps, object_hook
+import database
+from pymongo.errors import BulkWriteError
+from chalicelib.bulk import bulk_write, to_request, BULK_CHUNK_SIZE
+
+READ_SIZE = 64 * 1024
+
+
+def read_array(f, read_size=READ_SIZE):
+    # the rest of a JSON array whose [ has been read, decoded an element at
+    # a time as the file is read, so a big export is never in memory whole
+    decoder = json.JSONDecoder(object_hook=object_hook)
+    buf, pos, eof = '', 0, False
+    first = True          # nothing decoded yet, so ] may close an empty array
+    after_value = False   # expecting , or ] rather than an element
+    while True:
+        while pos < len(buf) and buf[pos].isspace():
+            pos += 1
+        if pos < len(buf):
+            c = buf[pos]
+            if after_value or (first and c == ']'):
+                if c == ']':
+                    return
+                if c != ',':
+                    raise ValueError(f"expected ',' or ']' in JSON array, found {c!r}")
+                pos += 1
+                after_value = False
+                continue
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # a number cut off by the end of what has been read still
+                # decodes (1e as 1, -73. as -73), so only take a value that
+                # a , or ] follows
+                after = end
+                while after < len(buf) and buf[after].isspace():
+                    after += 1
+                if eof or (after < len(buf) and buf[after] in ',]'):
+                    yield value
+                    pos = end
+                    first, after_value = False, True
+                    continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        elif eof:
+            raise ValueError("JSON array is not closed")
+        chunk = f.read(read_size)
+        buf, pos = buf[pos:] + chunk, 0
+        eof = not chunk
+
+
+def read_items(f):
+    # a JSON array is decoded element by element; NDJSON a line at a time
+    first = f.read(1)
+    while first.isspace():
+        first = f.read(1)
+    if first == '[':
+        yield from read_array(f)
+        return
+    for line in itertools.chain([first + f.readline()], f):
+        if line.strip():
+            yield loads(line)
+
+
+def one_at_a_time(collection, items):
+    # the old way: one round trip per document
+    start = time.perf_counter()
+    count = 0
+    for item in items:
+        try:
+            collection.bulk_write([to_request(item)])
+        except (ValueError, BulkWriteError):
+            pass
+        count += 1
+    elapsed = time.perf_counter() - start
+    return count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load a JSON array or NDJSON file into MongoDB.')
+    parser.add_argument('file', help="input file, or - for stdin")
+    parser.add_argument('--db', default='sample_restaurants')
+    parser.add_argument('--collection', default='restaurants')
+    parser.add_argument('-c', '--chunk-size', type=int, default=BULK_CHUNK_SIZE, help='items per bulk_write')
+    parser.add_argument('--results', action='store_true', help='print every per-item result as NDJSON')
+    parser.add_argument('--compare', action='store_true',
+                        help='also time one write per document into <collection>_compare')
+    parser.add_argument('--mock', action='store_true', help='use mongomock instead of a server')
+    args = parser.parse_args()
+
+    if args.mock:
+        import mongomock
+        database.set_client(mongomock.MongoClient())
+    collection = database.get_db(args.db)[args.collection]
+
+    f = sys.stdin if args.file == '-' else open(args.file)
+    with f:
+        if args.compare:
+            items = list(read_items(f))
+            # keep a serialized copy, because the bulk run fills in _id
+            copies = [dumps(item) for item in items]
+        else:
+            items = read_items(f)
+        start = time.perf_counter()
+        summary = bulk_write(collection, items, args.chunk_size, results=args.results)
+        bulk_elapsed = time.perf_counter() - start
+
+    if args.results:
+        for result in summary.pop('results'):
+            print(json.dumps(result))
+    print(f"{summary['items']} items in {summary['seconds']:.2f}s ({summary['docs_per_sec']} docs/s): "
+          f"{summary['inserted']} inserted, {summary['matched']} matched, {summary['modified']} modified, "
+          f"{summary['upserted']} upserted, {summary['deleted']} deleted, {summary['errors']} errors",
+          file=sys.stderr)
+
+    if args.compare:
+        compare = database.get_db(args.db)[args.collection + '_compare']
+        compare.drop()
+        count, elapsed = one_at_a_time(compare, (loads(c) for c in copies))
+        # summary['seconds'] is rounded, and can be 0.0 for a small file
+        print(f"one at a time: {count} items in {elapsed:.2f}s ({count / elapsed:.0f} docs/s), "
+              f"bulk was {elapsed / bulk_elapsed:.1f}x faster", file=sys.stderr)
+        compare.drop()
+    database.close()
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
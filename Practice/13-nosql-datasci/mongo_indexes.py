@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+# Index advisor for the queries the scripts here and mongo-api/ run.
+#
+# For each query shape it asks the server for the winning plan (explain),
+# flags collection scans, creates the indexes below if they are missing and
+# prints the latency of the query before and after.
+#
+#   python3 mongo_indexes.py             # explain, create indexes, compare
+#   python3 mongo_indexes.py --dry-run   # only explain and time
+#   python3 mongo_indexes.py --drop      # remove the indexes created here
+#
+# create_index() is a no-op for an index that already exists, so this is
+# safe to run again (for example after reloading the data).
+
+import argparse
+import statistics
+import time
+from pymongo import ASCENDING
+import database
+
+# (database, collection, filter, where it comes from)
+QUERY_SHAPES = [
+    ('sample_restaurants', 'restaurants', {'borough': 'Brooklyn'}, 'mongo_read.py, mongo_thinread.py'),
+    ('sample_restaurants', 'restaurants', {'cuisine': 'Italian'}, 'mongo_setup.py'),
+    ('sample_restaurants', 'restaurants', {'borough': 'Brooklyn', 'cuisine': 'Italian'}, 'borough + cuisine'),
+    ('sample_restaurants', 'restaurants', {'name': "Mama Gina's Classy Kitchen"},
+     'mongo_create.py, mongo_update.py, mongo_delete.py'),
+    ('things', 'hobbies', {'name': 'chess'}, 'POST /hobbies/bulk updates and deletes'),
+]
+
+# (database, collection, keys); the borough+cuisine index also serves
+# queries on borough alone, since borough is its first key
+INDEXES = [
+    ('sample_restaurants', 'restaurants', [('borough', ASCENDING), ('cuisine', ASCENDING)]),
+    ('sample_restaurants', 'restaurants', [('cuisine', ASCENDING)]),
+    ('sample_restaurants', 'restaurants', [('name', ASCENDING)]),
+    ('things', 'hobbies', [('name', ASCENDING)]),
+]
+
+
+def index_name(keys):
+    # the same name the server would generate
+    return '_'.join(f'{field}_{direction}' for field, direction in keys)
+
+
+def plan_stages(plan):
+    # walk the winning plan tree and yield every stage name
+    yield plan.get('stage')
+    if 'inputStage' in plan:
+        yield from plan_stages(plan['inputStage'])
+    for child in plan.get('inputStages', []):
+        yield from plan_stages(child)
+
+
+def explain(collection, query):
+    planner = collection.find(query).explain()['queryPlanner']
+    plan = planner['winningPlan']
+    # newer servers wrap the classic plan in a query engine section
+    plan = plan.get('queryPlan', plan)
+    stages = list(plan_stages(plan))
+    if 'COLLSCAN' in stages:
+        return 'COLLSCAN', None
+    return 'IXSCAN', plan_index(plan)
+
+
+def plan_index(plan):
+    if 'indexName' in plan:
+        return plan['indexName']
+    for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+        if child:
+            name = plan_index(child)
+            if name:
+                return name
+    return None
+
+
+def latency(collection, query, repeat):
+    # median time of the count the scripts run on this filter
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        collection.count_documents(query)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def report(repeat):
+    results = []
+    for db, coll, query, source in QUERY_SHAPES:
+        collection = database.get_db(db)[coll]
+        scan, index = explain(collection, query)
+        ms = latency(collection, query, repeat)
+        results.append((scan, ms))
+        flag = '  <-- collection scan' if scan == 'COLLSCAN' else ''
+        print(f"{db}.{coll} {query}  [{source}]")
+        print(f"    {scan:<8} {index or '':<24} {ms:8.2f} ms{flag}")
+    return results
+
+
+def create_indexes():
+    for db, coll, keys in INDEXES:
+        collection = database.get_db(db)[coll]
+        name = index_name(keys)
+        if name in collection.index_information():
+            print(f"exists   {db}.{coll} {name}")
+            continue
+        collection.create_index(keys, name=name)
+        print(f"created  {db}.{coll} {name}")
+
+
+def drop_indexes():
+    for db, coll, keys in INDEXES:
+        collection = database.get_db(db)[coll]
+        name = index_name(keys)
+        if name in collection.index_information():
+            collection.drop_index(name)
+            print(f"dropped  {db}.{coll} {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Explain the scripts\' queries and create missing indexes.')
+    parser.add_argument('--dry-run', action='store_true', help='do not create indexes')
+    parser.add_argument('--drop', action='store_true', help='drop the indexes this script creates')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per query')
+    args = parser.parse_args()
+
+    if args.drop:
+        drop_indexes()
+        database.close()
+        return
+
+    print("before:")
+    before = report(args.repeat)
+    if args.dry_run:
+        database.close()
+        return
+    print()
+    create_indexes()
+    print("\nafter:")
+    after = report(args.repeat)
+
+    print()
+    for (db, coll, query, _), (_, old), (_, new) in zip(QUERY_SHAPES, before, after):
+        print(f"{coll:<12} {str(query):<60} {old:8.2f} ms -> {new:8.2f} ms")
+    database.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,7 @@
 #!/usr/bin/env python3
 
-from pymongo import MongoClient, errors
 from bson.json_util import dumps
-import prettyprint as pprint
-import os
-
-mongopass = os.getenv('MONGOPASS')
-uri = "mongodb+srv://cluster0.pguxs.mongodb.net/sample_restaurants"
-client = MongoClient(uri, username='mongo', password=mongopass, connectTimeoutMS=200, retryWrites=True)
-sampler = client.sample_restaurants
-restaurants = sampler.restaurants
+from database import restaurants
 
 # Get a single record - in natural order
 get_one = restaurants.find_one()
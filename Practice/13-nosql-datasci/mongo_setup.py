@@ -1,12 +1,10 @@
 #!/usr/bin/env python3
 
-from pymongo import MongoClient, errors
-import os
-from database import *
+from database import get_client
+from mongo_analytics import counts_by
 
-# mongopass = os.getenv('MONGOPASS')
-# uri = "mongodb+srv://cluster0.pnxzwgz.mongodb.net/sample_restaurants"
-# client = MongoClient(uri, username='nmagee', password=mongopass, connectTimeoutMS=200, retryWrites=True)
+# The shared client comes from database.py (settings from the environment)
+client = get_client()
 
 stats = client.stats
 print(stats)
@@ -19,7 +17,14 @@ colls = thisdb.list_collection_names()
 print(colls)
 
 restaurants = thisdb.restaurants
-count = restaurants.count_documents({})
+# an unfiltered count comes from collection metadata instead of a scan
+count = restaurants.estimated_document_count()
 print(count, "restaurants")
+
 italian = restaurants.count_documents({'cuisine': 'Italian'})
 print(italian, "Italian restaurants")
+
+# Counting every cuisine takes one aggregation on the server (see
+# mongo_analytics.py) instead of one count_documents() call per cuisine
+cuisines = counts_by('cuisine')
+print(len(cuisines['cuisine']), "cuisines")
@@ -1,23 +1,13 @@
 #!/usr/bin/env python3
 
-from pymongo import MongoClient, errors
 from bson.json_util import dumps
-import prettyprint as pprint
-import os
-
-mongopass = os.getenv('MONGOPASS')
-uri = "mongodb+srv://cluster0.pguxs.mongodb.net/sample_restaurants"
-client = MongoClient(uri, username='mongo', password=mongopass, connectTimeoutMS=200, retryWrites=True)
-sampler = client.sample_restaurants
-restaurants = sampler.restaurants
+from database import restaurants
 
 # Updates a single record - the first matching criteria
-# using the $set operator
-restaurants.update_one({"name": "Mama Gina's Classy Kitchen"}, {"$set": {"freshness_factor":"8"}})
-
-# Update a single record - add tags
-# using the $push operator
-restaurants.update_one({"name": "Mama Gina's Classy Kitchen"}, {"$push": {"tagz":"fancy"}})
+# using the $set operator to change a field and the $push operator
+# to add tags, both in one round trip to the server
+restaurants.update_one({"name": "Mama Gina's Classy Kitchen"},
+                       {"$set": {"freshness_factor":"8"}, "$push": {"tagz":"fancy"}})
 
 # Updates several records - all matching criteria
 # restaurants.update_many(new_record)
@@ -1,22 +1,24 @@
 #!/usr/bin/env python3
 
-import json
-import requests
+from notifier import Notifier
 
-# Set up your data payload. This is what is POSTed to the #bot channel. The content
+# Set up your message. This is what is POSTed to the #bot channel. The text
 # may consist of plain text, markdown text, URLs, image links, etc. Feel free to test.
-# All parameters available to you in this method "Execute Webhook" can be found here: 
-# https://discord.com/developers/docs/resources/webhook#execute-webhook 
+# All parameters available to you in this method "Execute Webhook" can be found here:
+# https://discord.com/developers/docs/resources/webhook#execute-webhook
 
-data = { 
-    "content": "This **bot** means business!! https://i.imgur.com/AaWEBMY.jpg",
-    "username": "REPLACE_WITH_YOUR_ID",
-    "avatar_url": "REPLACE_WITH_CREATIVE_URL"
-}
+message = "This **bot** means business!! https://i.imgur.com/AaWEBMY.jpg"
 
-# The URL below should be treated like a password and NOT published in code. Consider
-# passing it into your app as an ENV variable.
-url = "https://discord.com/api/webhooks/xxxxx/yyyyy"
+# The webhook URL should be treated like a password and NOT published in code, so
+# the notifier reads it from an ENV variable:
+#   export DISCORD_WEBHOOK_URL="https://discord.com/api/webhooks/xxxxx/yyyyy"
+bot = Notifier(username="REPLACE_WITH_YOUR_ID", avatar_url="REPLACE_WITH_CREATIVE_URL")
 
-response = requests.post(url, json = data)
-print(response)
+# notify() returns right away; a background thread batches the messages and
+# posts them, waiting out Discord's rate limits. Send as many as you like.
+bot.notify(message)
+bot.notify("Job finished", title="ETL", color=0x2ecc71)
+
+# close() waits until everything queued has been delivered
+bot.close()
+print(bot.stats)
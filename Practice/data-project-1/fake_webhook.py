@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+# A local stand-in for a Discord webhook, to measure how fast and how
+# reliably messages get delivered without spamming a real channel.
+#
+#   python3 fake_webhook.py --port 8766 &
+#   DISCORD_WEBHOOK_URL=http://localhost:8766/api/webhooks/1/test ./discord.py
+#
+#   python3 fake_webhook.py --bench -n 500    # naive posts vs notifier.py
+#
+# Like Discord, it allows `--limit` requests per `--per` seconds per webhook
+# and answers the rest with 429 and a JSON `retry_after`.
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeWebhook(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, limit=5, per=2.0, latency=0.05):
+        super().__init__(address, Handler)
+        self.limit = limit
+        self.per = per
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.used = 0
+        self.requests = 0
+        self.rejected = 0
+        # (time received, text of each message)
+        self.received = []
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/api/webhooks/1/test"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body=None, headers=None):
+        payload = b'' if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(payload)))
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server = self.server
+        data = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        time.sleep(server.latency)
+        now = time.monotonic()
+        with server.lock:
+            server.requests += 1
+            if now - server.window_start >= server.per:
+                server.window_start, server.used = now, 0
+            reset_after = server.per - (now - server.window_start)
+            headers = {'X-RateLimit-Bucket': 'fake-webhook', 'X-RateLimit-Limit': str(server.limit),
+                       'X-RateLimit-Reset-After': f'{reset_after:.3f}'}
+            if server.used >= server.limit:
+                server.rejected += 1
+                headers['X-RateLimit-Remaining'] = '0'
+                headers['Retry-After'] = str(max(1, round(reset_after)))
+                return self.reply(429, {'message': 'You are being rate limited.',
+                                        'retry_after': round(reset_after, 3), 'global': False}, headers)
+            server.used += 1
+            headers['X-RateLimit-Remaining'] = str(server.limit - server.used)
+            # one line of an embed description, or the content, is one message
+            texts = [data['content']] if data.get('content') else []
+            for embed in data.get('embeds', []):
+                texts.extend(embed.get('description', '').split('\n'))
+            server.received.extend((now, text) for text in texts)
+        self.reply(204, headers=headers)
+
+
+def start(port=0, **options):
+    server = FakeWebhook(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench(n, limit, per, latency):
+    import requests
+    from notifier import Notifier
+
+    def report(name, server, hot_path, started):
+        delivered = len(server.received)
+        # delivery latency: from the message being produced to it arriving
+        latencies = [received - started[text] for received, text in server.received if text in started]
+        last = max((r for r, _ in server.received), default=time.monotonic())
+        span = last - min(started.values())
+        print(f"{name:<20} hot path {hot_path * 1000:9.1f} ms  delivered {delivered:>5}/{n}  "
+              f"{delivered / span:8.1f} msg/s  latency p50 {statistics.median(latencies):6.2f}s "
+              f"max {max(latencies):6.2f}s  requests {server.requests} (429s: {server.rejected})")
+
+    # the old discord.py: one blocking post per message, no retries
+    server = start(limit=limit, per=per, latency=latency)
+    started = {}
+    begin = time.perf_counter()
+    for i in range(n):
+        text = f"message {i}"
+        started[text] = time.monotonic()
+        requests.post(server.url, json={'content': text})
+    report('requests.post each', server, time.perf_counter() - begin, started)
+    server.shutdown()
+
+    server = start(limit=limit, per=per, latency=latency)
+    started = {}
+    bot = Notifier(server.url, batch_window=0.2)
+    begin = time.perf_counter()
+    for i in range(n):
+        text = f"message {i}"
+        started[text] = time.monotonic()
+        bot.notify(text)
+    hot_path = time.perf_counter() - begin
+    bot.close()
+    report('Notifier', server, hot_path, started)
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Discord webhook with rate limits, or a delivery benchmark.')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--limit', type=int, default=5, help='requests per window')
+    parser.add_argument('--per', type=float, default=2.0, help='window, seconds')
+    parser.add_argument('--latency', type=float, default=50, help='delay per request, milliseconds')
+    parser.add_argument('--bench', action='store_true')
+    parser.add_argument('-n', type=int, default=500, help='messages sent by --bench')
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.n, args.limit, args.per, args.latency / 1000)
+        return
+    server = FakeWebhook(('127.0.0.1', args.port), args.limit, args.per, args.latency / 1000)
+    print(f"fake webhook on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{len(server.received)} messages in {server.requests} requests, {server.rejected} rate limited")
+
+
+if __name__ == '__main__':
+    main()
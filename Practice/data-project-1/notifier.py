@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+# Send status messages to a Discord webhook without slowing down the job
+# that produces them.
+#
+#   from notifier import Notifier
+#   bot = Notifier()                     # webhook URL from DISCORD_WEBHOOK_URL
+#   bot.notify("ETL started")            # returns at once
+#   bot.notify("rows loaded", title="load", color=0x2ecc71)
+#   bot.close()                          # deliver what is left, then stop
+#
+# notify() only puts the message on a queue. A background thread collects
+# whatever arrives within `batch_window` seconds and sends it as few webhook
+# requests as possible: up to 10 embeds per request, with runs of plain
+# messages packed into one embed. One requests.Session is reused for every
+# request. When Discord answers 429 the thread waits `retry_after` and
+# sends the same payload again, and it waits for the bucket to reset
+# whenever X-RateLimit-Remaining reaches 0, so nothing is lost to rate
+# limits.
+#
+#   DISCORD_WEBHOOK_URL=https://discord.com/api/webhooks/xxxxx/yyyyy ./notifier.py "hello"
+
+import os
+import queue
+import sys
+import threading
+import time
+import requests
+
+DISCORD_WEBHOOK_URL = os.getenv('DISCORD_WEBHOOK_URL')
+
+# Discord's limits for one webhook request
+MAX_EMBEDS = 10
+MAX_DESCRIPTION = 4096
+MAX_EMBED_CHARS = 6000
+
+
+def build_payloads(messages, username=None, avatar_url=None):
+    """Pack queued messages into as few webhook payloads as Discord allows."""
+    return [payload for payload, _ in pack_payloads(messages, username, avatar_url)]
+
+
+def pack_payloads(messages, username=None, avatar_url=None):
+    """build_payloads(), paired with how many of `messages` (in order) each payload carries."""
+    payloads = []
+    embeds, chars, count = [], 0, 0
+
+    def finish():
+        nonlocal embeds, chars, count
+        if embeds:
+            payload = {'embeds': embeds}
+            if username:
+                payload['username'] = username
+            if avatar_url:
+                payload['avatar_url'] = avatar_url
+            payloads.append((payload, count))
+        embeds, chars, count = [], 0, 0
+
+    for message in messages:
+        text = message['text'][:MAX_DESCRIPTION]
+        plain = set(message) == {'text'}
+        last = embeds[-1] if embeds else None
+        # a plain message joins the previous plain embed if it still fits
+        if (plain and last is not None and last.get('_plain')
+                and len(last['description']) + 1 + len(text) <= MAX_DESCRIPTION
+                and chars + 1 + len(text) <= MAX_EMBED_CHARS):
+            last['description'] += '\n' + text
+            chars += 1 + len(text)
+            count += 1
+            continue
+        embed = {'description': text}
+        if plain:
+            embed['_plain'] = True
+        if message.get('title'):
+            embed['title'] = message['title'][:256]
+        if message.get('color') is not None:
+            embed['color'] = message['color']
+        size = len(text) + len(embed.get('title', ''))
+        if len(embeds) == MAX_EMBEDS or chars + size > MAX_EMBED_CHARS:
+            finish()
+        embeds.append(embed)
+        chars += size
+        count += 1
+    finish()
+    for payload, _ in payloads:
+        for embed in payload['embeds']:
+            embed.pop('_plain', None)
+    return payloads
+
+
+class Notifier:
+    def __init__(self, url=DISCORD_WEBHOOK_URL, username=None, avatar_url=None,
+                 batch_window=0.5, max_queue=10000, retries=5, session=None):
+        if not url:
+            raise ValueError("no webhook URL: pass one or set DISCORD_WEBHOOK_URL")
+        self.url = url
+        self.username = username
+        self.avatar_url = avatar_url
+        self.batch_window = batch_window
+        self.retries = retries
+        self.session = session or requests.Session()
+        self._queue = queue.Queue(max_queue)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._blocked_until = 0
+        self._stop = threading.Event()
+        self.bucket = None
+        # updated from both threads, always under self._idle
+        self._stats = {'queued': 0, 'delivered': 0, 'dropped': 0, 'failed': 0,
+                       'requests': 0, 'rate_limited': 0, 'max_latency': 0.0, 'total_latency': 0.0}
+        self._thread = threading.Thread(target=self._run, name='discord-notifier', daemon=True)
+        self._thread.start()
+
+    def notify(self, text, title=None, color=None):
+        """Queue a message; never blocks. Returns False if the queue is full."""
+        message = {'text': str(text)}
+        if title:
+            message['title'] = title
+        if color is not None:
+            message['color'] = color
+        with self._idle:
+            try:
+                self._queue.put_nowait((time.monotonic(), message))
+            except queue.Full:
+                self._stats['dropped'] += 1
+                return False
+            self._pending += 1
+            self._stats['queued'] += 1
+        return True
+
+    @property
+    def stats(self):
+        with self._idle:
+            return dict(self._stats)
+
+    def _count(self, name, n=1):
+        with self._idle:
+            self._stats[name] += n
+
+    def _done(self, n):
+        with self._idle:
+            self._pending -= n
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been sent (or given up on)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        self.flush(timeout)
+        self._stop.set()
+        try:
+            # wake the thread if it is waiting on an empty queue
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # then it isn't waiting, and stops after the batch it is on
+            pass
+        self._thread.join(max(0, deadline - time.monotonic()))
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # gather everything else that arrives within the window
+            deadline = time.monotonic() + self.batch_window
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    break
+                batch.append(item)
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        # each payload carries the next `count` messages of the batch, and
+        # succeeds or fails on its own
+        start = 0
+        for payload, count in pack_payloads([m for _, m in batch], self.username, self.avatar_url):
+            ok = self._post(payload)
+            now = time.monotonic()
+            with self._idle:
+                if ok:
+                    self._stats['delivered'] += count
+                    for queued_at, _ in batch[start:start + count]:
+                        latency = now - queued_at
+                        self._stats['total_latency'] += latency
+                        self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+                else:
+                    self._stats['failed'] += count
+            start += count
+        self._done(len(batch))
+
+    def _post(self, payload):
+        for attempt in range(self.retries + 1):
+            delay = self._blocked_until - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                response = self.session.post(self.url, json=payload, timeout=10)
+            except requests.RequestException as e:
+                print(f"discord notifier: {e}", file=sys.stderr)
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            self._count('requests')
+            self._note_bucket(response)
+            if response.status_code == 429:
+                self._count('rate_limited')
+                try:
+                    retry_after = float(response.json().get('retry_after', 1))
+                except ValueError:
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                continue
+            if response.status_code >= 500:
+                time.sleep(min(2 ** attempt, 30))
+                continue
+            if response.status_code >= 400:
+                print(f"discord notifier: {response.status_code} {response.text}", file=sys.stderr)
+                return False
+            return True
+        return False
+
+    def _note_bucket(self, response):
+        # Discord tells us how many requests are left in this webhook's
+        # bucket and when it refills; wait instead of collecting a 429
+        headers = response.headers
+        self.bucket = headers.get('X-RateLimit-Bucket', self.bucket)
+        if headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset-After' in headers:
+            reset = time.monotonic() + float(headers['X-RateLimit-Reset-After'])
+            self._blocked_until = max(self._blocked_until, reset)
+
+
+if __name__ == '__main__':
+    with Notifier() as bot:
+        for text in sys.argv[1:] or ["This **bot** means business!!"]:
+            bot.notify(text)